@@ -3,6 +3,8 @@ from flask_cors import CORS
 import os
 import json
 import time
+import hashlib
+import hmac
 from datetime import datetime
 import threading
 from queue import Queue
@@ -11,26 +13,68 @@ import uuid
 # Import your existing modules
 from get_links import get_links
 from scrape import scrape_links, initialize_logs
-from cleaning import combine_logs
-from llm import call_gemini, context_combine_prompt
+from cleaning import combine_logs, load_sources
+from llm import call_gemini, context_combine_prompt, map_reduce_generate
+from refresh import find_previous_run, refresh_links, answer_key, save_answer, load_cached_answer
+from cancellation import TaskCancelled, check_cancelled
+from usage import UsageLedger, TokenUsage, QuotaExceeded, UnknownClient, ANONYMOUS_CLIENT
+from prefetch import Prefetcher
+from assets import load_assets, asset_url, asset_response, find_fingerprinted, get_asset, compress_response
+from logger import ensure_logging, get_logger, current_task_id
 
 app = Flask(__name__)
 CORS(app)
 
+# Configured on import so `flask run` and WSGI servers log too, not only `python app.py`
+ensure_logging()
+log = get_logger("app")
+
+# Fingerprint and precompress style.css / script.js once at startup
+load_assets(app.root_path)
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': asset_url}
+
 # Store active processing tasks
 active_tasks = {}
 task_queue = Queue()
 
+# Cancel running tasks that no client has checked on for this many seconds. The page polls
+# every second and cancels explicitly when closed, so this only catches clients that vanished;
+# it is generous because browsers throttle timers in background tabs to about once a minute
+TASK_IDLE_TIMEOUT = int(os.environ.get('TASK_IDLE_TIMEOUT', '600'))
+IDLE_CHECK_INTERVAL = 5
+
+FINISHED_STATUSES = ('completed', 'error', 'cancelled')
+
+# Per-client request/token accounting; clients identify themselves with X-API-Key
+usage_ledger = UsageLedger()
+
+# Bearer token for GET /api/usage; the endpoint is disabled without one
+USAGE_ADMIN_TOKEN = os.environ.get('USAGE_ADMIN_TOKEN')
+
+# Search results and top pages warmed while the user is still typing
+prefetcher = Prefetcher()
+
 class ResearchTask:
-    def __init__(self, task_id, topic, response_style="Comprehensive", include_sources=True):
+    def __init__(self, task_id, topic, response_style="Comprehensive", include_sources=True, incremental=False,
+                 generation_mode="single", client=ANONYMOUS_CLIENT, prefetch_key=None):
         self.task_id = task_id
         self.topic = topic
         self.response_style = response_style
         self.include_sources = include_sources
+        self.incremental = incremental
+        self.generation_mode = generation_mode
+        self.client = client
+        self.prefetch_key = prefetch_key
+        self.usage = TokenUsage()
         self.status = "initializing"
         self.progress = 0
         self.current_step = ""
         self.start_time = time.time()
+        self.last_checked = self.start_time
+        self.cancel_event = threading.Event()
         self.result = None
         self.error = None
         self.metadata = {
@@ -41,6 +85,10 @@ class ResearchTask:
 
 def process_research_task(task):
     """Process a research task in the background"""
+    # Every log record from this thread carries the task id
+    task_id_token = current_task_id.set(task.task_id)
+    log.info("Task started", extra={"topic": task.topic, "mode": task.generation_mode,
+                                    "incremental": task.incremental, "client": task.client})
     try:
         active_tasks[task.task_id] = task
         
@@ -49,41 +97,64 @@ def process_research_task(task):
         task.current_step = "Searching web sources"
         task.progress = 10
         
-        links = get_links(task.topic)
+        # Start from the prefetch warmed while the topic was typed, if there is one
+        warmed = prefetcher.claim(task.topic, task.prefetch_key) if task.prefetch_key else None
+        links = warmed.links if warmed else get_links(task.topic)
+        task.metadata["prefetched_pages"] = len(warmed.pages) if warmed else 0
         task.metadata["sources_count"] = len(links)
         task.progress = 25
+        check_cancelled(task.cancel_event)
         
         # Step 2: Scrape content
         task.status = "scraping"
         task.current_step = "Scraping content"
         
+        previous_folder = find_previous_run(task.topic) if task.incremental else None
         log_folder = initialize_logs(task.topic)
-        scrape_links(links, save_logs=True, log_folder=log_folder)
+        if previous_folder:
+            task.metadata["refresh"] = refresh_links(links, log_folder, previous_folder, task.cancel_event)
+        else:
+            scrape_links(links, save_logs=True, log_folder=log_folder, cancel_event=task.cancel_event,
+                         prefetched=warmed.pages if warmed else None)
         task.progress = 50
+        check_cancelled(task.cancel_event)
         
         # Step 3: Process data
         task.status = "processing"
         task.current_step = "Processing data"
         
-        context_from_logs = combine_logs(log_folder)
+        if task.generation_mode == "map_reduce":
+            # Every page becomes its own source instead of one 7,500-char context
+            sources = load_sources(log_folder)
+            context_from_logs = "\n\n".join(sources) if sources else None
+        else:
+            context_from_logs = combine_logs(log_folder)
         task.progress = 75
+        check_cancelled(task.cancel_event)
         
         # Step 4: Generate insights
         task.status = "generating"
         task.current_step = "Generating insights"
         
         if context_from_logs:
-            final_prompt = context_combine_prompt(
-                context_from_logs, 
-                task.topic, 
-                task.response_style, 
-                task.include_sources
-            )
-            
-            # Estimate tokens (rough calculation)
-            task.metadata["tokens_used"] = len(final_prompt) // 4
+            # Reuse the previous answer when the assembled context is unchanged
+            key = answer_key(context_from_logs, task.topic, task.response_style, task.include_sources,
+                             task.generation_mode)
+            answer = load_cached_answer(previous_folder, key)
+            task.metadata["llm_skipped"] = answer is not None
             
-            answer = call_gemini(final_prompt)
+            if answer is None and task.generation_mode == "map_reduce":
+                answer = map_reduce_generate(sources, task.topic, task.response_style, task.include_sources,
+                                             cancel_event=task.cancel_event, usage=task.usage)
+            elif answer is None:
+                final_prompt = context_combine_prompt(
+                    context_from_logs, 
+                    task.topic, 
+                    task.response_style, 
+                    task.include_sources
+                )
+                answer = call_gemini(final_prompt, cancel_event=task.cancel_event, usage=task.usage)
+            save_answer(log_folder, key, answer)
             task.result = answer
             task.progress = 100
             task.status = "completed"
@@ -91,13 +162,26 @@ def process_research_task(task):
             task.error = "No information found for this topic"
             task.status = "error"
             
+    except TaskCancelled:
+        task.error = "Task was cancelled"
+        task.status = "cancelled"
+        log.info("Task cancelled")
+    
     except Exception as e:
         task.error = str(e)
         task.status = "error"
-        print(f"Error processing task {task.task_id}: {e}")
+        log.exception("Error processing task")
     
     finally:
         task.metadata["processing_time"] = time.time() - task.start_time
+        # Real token counts reported by Gemini, not a prompt-length estimate
+        task.metadata["usage"] = task.usage.as_dict()
+        task.metadata["tokens_used"] = task.metadata["usage"]["total_tokens"]
+        usage_ledger.settle(task.task_id, task.metadata["usage"])
+        log.info("Task finished", extra={"status": task.status,
+                                         "processing_time_ms": round(task.metadata["processing_time"] * 1000),
+                                         "total_tokens": task.metadata["tokens_used"]})
+        current_task_id.reset(task_id_token)
 
 @app.route('/')
 def index():
@@ -106,17 +190,28 @@ def index():
 
 @app.route('/style.css')
 def serve_css():
-    """Serve CSS file"""
-    response = send_from_directory('.', 'style.css', mimetype='text/css')
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+    """Serve CSS file (unfingerprinted URL, revalidated via ETag)"""
+    return serve_plain_asset('style.css')
 
 @app.route('/script.js')
 def serve_js():
-    """Serve JavaScript file"""
-    return send_from_directory('.', 'script.js', mimetype='application/javascript')
+    """Serve JavaScript file (unfingerprinted URL, revalidated via ETag)"""
+    return serve_plain_asset('script.js')
+
+def serve_plain_asset(name):
+    """Serve an asset at its plain URL, revalidated via ETag"""
+    asset = get_asset(name)
+    if asset is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    return asset_response(asset, request, immutable=False)
+
+@app.route('/assets/<filename>')
+def serve_asset(filename):
+    """Serve content-hashed assets with long-lived immutable caching"""
+    asset = find_fingerprinted(filename)
+    if asset is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    return asset_response(asset, request)
 
 @app.route('/static/<path:filename>')
 def static_files(filename):
@@ -138,12 +233,28 @@ def start_research():
         
         response_style = data.get('response_style', 'Comprehensive')
         include_sources = data.get('include_sources', True)
+        incremental = data.get('incremental', False)
+        generation_mode = data.get('generation_mode', 'single')
+        if generation_mode not in ('single', 'map_reduce'):
+            return jsonify({'error': "generation_mode must be 'single' or 'map_reduce'"}), 400
         
         # Generate unique task ID
         task_id = str(uuid.uuid4())
         
+        # Enforce the client's request and token quotas before doing any work
+        try:
+            client = usage_ledger.resolve_client(request.headers.get('X-API-Key'))
+            usage_ledger.admit(client, task_id, generation_mode)
+        except UnknownClient as e:
+            return jsonify({'error': str(e)}), 401
+        except QuotaExceeded as e:
+            response = jsonify({'error': str(e), 'client': client})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+        
         # Create research task
-        task = ResearchTask(task_id, topic, response_style, include_sources)
+        task = ResearchTask(task_id, topic, response_style, include_sources, incremental, generation_mode,
+                            client, prefetch_client_key(client, data))
         
         # Start processing in background thread
         thread = threading.Thread(target=process_research_task, args=(task,))
@@ -159,6 +270,29 @@ def start_research():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def requested_fields():
+    """Parse the optional ?fields=a,b,c filter (None means all fields)"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+def select_fields(payload, fields):
+    """Keep only the requested fields; task_id is always returned"""
+    if fields is None:
+        return payload
+    return {key: value for key, value in payload.items() if key in fields or key == 'task_id'}
+
+def conditional_json(payload):
+    """JSON response with an ETag derived from its content, 304 support and compression"""
+    body = app.json.dumps(payload)
+    response = app.response_class(body + '\n', mimetype='application/json')
+    # Weak ETag: gzip/br/identity variants of the same task state are equivalent
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest()[:16], weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.make_conditional(request)
+    return compress_response(response, request)
+
 @app.route('/api/research/<task_id>/status', methods=['GET'])
 def get_research_status(task_id):
     """Get the status of a research task"""
@@ -167,6 +301,7 @@ def get_research_status(task_id):
             return jsonify({'error': 'Task not found'}), 404
         
         task = active_tasks[task_id]
+        task.last_checked = time.time()
         
         response = {
             'task_id': task_id,
@@ -178,10 +313,10 @@ def get_research_status(task_id):
         
         if task.status == 'completed':
             response['result'] = task.result
-        elif task.status == 'error':
+        elif task.status in ('error', 'cancelled'):
             response['error'] = task.error
         
-        return jsonify(response)
+        return conditional_json(select_fields(response, requested_fields()))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -194,6 +329,7 @@ def get_research_result(task_id):
             return jsonify({'error': 'Task not found'}), 404
         
         task = active_tasks[task_id]
+        task.last_checked = time.time()
         
         if task.status != 'completed':
             return jsonify({
@@ -202,13 +338,94 @@ def get_research_result(task_id):
                 'progress': task.progress
             }), 202
         
-        return jsonify({
+        return conditional_json(select_fields({
             'task_id': task_id,
             'result': task.result,
             'metadata': task.metadata,
             'topic': task.topic,
             'response_style': task.response_style,
             'include_sources': task.include_sources
+        }, requested_fields()))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/research/<task_id>', methods=['DELETE'])
+def cancel_research(task_id):
+    """Cancel a running research task"""
+    if task_id not in active_tasks:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    task = active_tasks[task_id]
+    
+    if task.status in FINISHED_STATUSES:
+        return jsonify({
+            'error': 'Task already finished',
+            'status': task.status
+        }), 409
+    
+    # The worker stops at its next check and marks the task cancelled
+    task.cancel_event.set()
+    
+    return jsonify({
+        'task_id': task_id,
+        'status': 'cancelling',
+        'message': 'Cancellation requested'
+    }), 202
+
+def prefetch_client_key(client, data):
+    """Who a prefetch belongs to; only a research request with the same key can claim it.
+
+    The page sends a random session id so users behind one NAT or proxy do
+    not evict or claim each other's prefetches.
+    """
+    session = str(data.get('session', ''))[:64]
+    return f"{client}|{request.remote_addr}|{session}"
+
+@app.route('/api/prefetch', methods=['POST'])
+def prefetch_topic():
+    """Warm search results and top pages for a topic the user is still typing (best effort)"""
+    data = request.get_json(silent=True) or {}
+    topic = str(data.get('topic', '')).strip()
+    if not topic:
+        return jsonify({'error': 'Topic is required'}), 400
+    
+    try:
+        client = usage_ledger.resolve_client(request.headers.get('X-API-Key'))
+    except UnknownClient as e:
+        return jsonify({'error': str(e)}), 401
+    
+    # One live prefetch per browser session: a new topic replaces the one the user typed past
+    prefetch_key = prefetch_client_key(client, data)
+    try:
+        # Every new speculative search counts against the client's prefetch quota
+        status = prefetcher.request(topic, prefetch_key, admit=lambda: usage_ledger.admit_prefetch(client))
+    except QuotaExceeded as e:
+        response = jsonify({'error': str(e), 'client': client})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    return jsonify({'topic': topic, 'status': status}), 202
+
+@app.route('/api/usage', methods=['GET'])
+def get_usage():
+    """Report request and token usage per client over a time window (admin only)"""
+    if not USAGE_ADMIN_TOKEN:
+        return jsonify({'error': 'Usage reporting is disabled (set USAGE_ADMIN_TOKEN)'}), 403
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode('utf-8'), USAGE_ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({'error': 'Admin token required'}), 401
+    
+    try:
+        window = request.args.get('window', type=int) or usage_ledger.window
+        if window <= 0:
+            return jsonify({'error': 'window must be a positive number of seconds'}), 400
+        
+        client = request.args.get('client')
+        
+        return jsonify({
+            'window_seconds': window,
+            'quota_window_seconds': usage_ledger.window,
+            'clients': usage_ledger.summary(client, window)
         })
         
     except Exception as e:
@@ -258,6 +475,23 @@ def cleanup_old_tasks():
     # Schedule next cleanup
     threading.Timer(300, cleanup_old_tasks).start()  # Run every 5 minutes
 
+def cancel_idle_tasks():
+    """Cancel running tasks nobody has polled for TASK_IDLE_TIMEOUT seconds"""
+    current_time = time.time()
+    
+    for task in list(active_tasks.values()):
+        idle = current_time - task.last_checked
+        if task.status not in FINISHED_STATUSES and idle > TASK_IDLE_TIMEOUT and not task.cancel_event.is_set():
+            log.info("Cancelling idle task", extra={"task_id": task.task_id, "idle_seconds": round(idle)})
+            task.cancel_event.set()
+    
+    # Drop prefetches nobody submitted within PREFETCH_TTL
+    prefetcher.evict_expired()
+    
+    timer = threading.Timer(IDLE_CHECK_INTERVAL, cancel_idle_tasks)
+    timer.daemon = True
+    timer.start()
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -268,8 +502,9 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    # Start cleanup timer
+    # Start cleanup and idle-cancellation timers
     cleanup_old_tasks()
+    cancel_idle_tasks()
     
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
@@ -285,6 +520,9 @@ if __name__ == '__main__':
     print("   POST /api/research - Start new research")
     print("   GET  /api/research/<task_id>/status - Get task status")
     print("   GET  /api/research/<task_id>/result - Get task result")
+    print("   DELETE /api/research/<task_id> - Cancel a running task")
+    print("   POST /api/prefetch - Warm search and pages while typing")
+    print("   GET  /api/usage - Token and request usage per client")
     print("   GET  /api/health - Health check")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
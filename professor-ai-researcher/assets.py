@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Files referenced from templates/index.html that get fingerprinted URLs
+ASSET_FILES = {
+    "style.css": "text/css",
+    "script.js": "application/javascript",
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred order when the client accepts several encodings
+ENCODING_PREFERENCE = ["br", "gzip"]
+
+# Dynamic (per-request) bodies use cheaper levels than startup precompression
+DYNAMIC_LEVELS = {"gzip": 6, "br": 5}
+STATIC_LEVELS = {"gzip": 9, "br": 11}
+
+# Below this size compression overhead outweighs the saved bytes
+MIN_COMPRESS_SIZE = 512
+
+
+def compress_body(body: bytes, encoding: str, level: int) -> bytes:
+    """Compress body with the given content-coding ("gzip" or "br")."""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def available_encodings():
+    return [e for e in ENCODING_PREFERENCE if e != "br" or brotli is not None]
+
+
+class StaticAsset:
+    """One version of an asset file: never modified once loaded, so a request
+    holding it always sees a digest, mtime and bodies that belong together."""
+
+    def __init__(self, name: str, path: str, mimetype: str):
+        self.name = name
+        self.path = path
+        self.mimetype = mimetype
+        self.mtime, self.digest, self.bodies = self.load()
+
+    def load(self):
+        """Read the file, hash it and precompress every supported encoding."""
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "rb") as f:
+            body = f.read()
+
+        bodies: Dict[str, bytes] = {"identity": body}
+        for encoding in available_encodings():
+            compressed = compress_body(body, encoding, STATIC_LEVELS[encoding])
+            if len(compressed) < len(body):
+                bodies[encoding] = compressed
+        return mtime, hashlib.sha256(body).hexdigest()[:12], bodies
+
+    def refresh(self) -> "StaticAsset":
+        """Return a newly loaded version if the file changed on disk, else self (keeps debug mode usable)."""
+        try:
+            if os.path.getmtime(self.path) != self.mtime:
+                return StaticAsset(self.name, self.path, self.mimetype)
+        except OSError:
+            pass
+        return self
+
+    @property
+    def fingerprinted_name(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest}{ext}"
+
+    @property
+    def url(self) -> str:
+        return f"/assets/{self.fingerprinted_name}"
+
+
+# name -> StaticAsset, filled by load_assets() at startup
+assets: Dict[str, StaticAsset] = {}
+
+
+def load_assets(base_dir: str) -> Dict[str, StaticAsset]:
+    """Fingerprint and precompress all known assets found in base_dir."""
+    assets.clear()
+    for name, mimetype in ASSET_FILES.items():
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            assets[name] = StaticAsset(name, path, mimetype)
+    return assets
+
+
+def get_asset(name: str) -> Optional[StaticAsset]:
+    """Current version of an asset, reloaded if its file changed; None if unknown."""
+    asset = assets.get(name)
+    if asset is None:
+        return None
+    fresh = asset.refresh()
+    if fresh is not asset:
+        assets[name] = fresh  # swapped whole, never updated in place
+    return fresh
+
+
+def asset_url(name: str) -> str:
+    """Template helper: return the content-hashed URL for an asset."""
+    asset = get_asset(name)
+    if asset is None:
+        return f"/{name}"
+    return asset.url
+
+
+def find_fingerprinted(filename: str) -> Optional[StaticAsset]:
+    """Look up an asset by its fingerprinted filename (e.g. style.1a2b3c4d5e6f.css)."""
+    for name in list(assets):
+        asset = get_asset(name)
+        if asset is not None and asset.fingerprinted_name == filename:
+            return asset
+    return None
+
+
+def choose_encoding(available, accept_encodings) -> str:
+    """Pick the preferred encoding from available that the client accepts."""
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in available and accept_encodings[encoding]:
+            return encoding
+    return "identity"
+
+
+def asset_response(asset: StaticAsset, request, immutable: bool = True) -> Response:
+    """Build a negotiated, conditional response for an asset.
+
+    Fingerprinted URLs are cached forever; plain URLs must revalidate but
+    still get a 304 when the ETag matches.
+    """
+    encoding = choose_encoding(asset.bodies, request.accept_encodings)
+
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    )
+    # Each encoding is a different representation, so it gets its own strong ETag
+    response.set_etag(f"{asset.digest}-{encoding}")
+    response.last_modified = asset.mtime
+
+    return response.make_conditional(request)
+
+
+def compress_response(response: Response, request, min_size: int = MIN_COMPRESS_SIZE) -> Response:
+    """Compress a dynamic 200 response in place if the client accepts it."""
+    response.vary.add("Accept-Encoding")
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    encoding = choose_encoding(available_encodings(), request.accept_encodings)
+    if encoding == "identity":
+        return response
+
+    response.set_data(compress_body(body, encoding, DYNAMIC_LEVELS[encoding]))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Measure per-task logging overhead of the scrape -> combine -> prompt pipeline
+Pages come from bench_corpus/html through a fake HTTP layer (no network, no LLM);
+tasks run concurrently like the web app's worker threads:
+    python bench_logging.py [--tasks 16] [--concurrency 8] [--links 10] [--small-pages] [--log-level DEBUG]
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import hosts
+import scrape
+from cleaning import combine_logs
+from llm import context_combine_prompt
+from logger import configure_logging, current_task_id, shutdown_logging
+
+HTML_DIR = Path(__file__).parent / "bench_corpus" / "html"
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.status_code = 200
+        self.headers = {}
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+# Near-empty page: extraction is cheap, so logging cost dominates the task
+SMALL_PAGE = b"<html><head><title>Small page</title></head><body><article><p>Short text.</p></article></body></html>"
+
+
+def install_fake_http(small_pages=False):
+    pages = [SMALL_PAGE] if small_pages else [p.read_bytes() for p in sorted(HTML_DIR.glob("*.html"))]
+
+    def get(url, timeout=10, headers=None, stream=False):
+        return FakeResponse(pages[hash(url) % len(pages)])
+
+    scrape.requests.get = get
+    hosts._scoreboard = hosts.HostScoreboard(path=None)
+
+
+def run_task(task_number, n_links, workdir):
+    log_folder = os.path.join(workdir, f"task_{task_number}")
+    os.makedirs(log_folder, exist_ok=True)
+    links = [f"https://site{i}.example/task{task_number}" for i in range(n_links)]
+
+    current_task_id.set(f"bench-{task_number}")
+    start = time.perf_counter()
+    scrape.scrape_links(links, save_logs=True, log_folder=log_folder)
+    context = combine_logs(log_folder)
+    context_combine_prompt(context, "MCP")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--links", type=int, default=10)
+    parser.add_argument("--small-pages", action="store_true", help="use a tiny page so logging dominates")
+    parser.add_argument("--log-level", default="INFO", help="pipeline log level (default: INFO)")
+    parser.add_argument("--log-format", default="json", choices=["json", "text"])
+    args = parser.parse_args()
+
+    install_fake_http(args.small_pages)
+    real_stdout = sys.stdout
+
+    with tempfile.TemporaryDirectory() as workdir:
+        output_path = os.path.join(workdir, "output.log")
+        # Pipeline output goes to a file through a real file descriptor, as it would to a terminal or pipe
+        with open(output_path, "w", buffering=1) as sink, \
+                contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            configure_logging(args.log_level, args.log_format, stream=sink)
+            run_task(-1, 2, workdir)  # warm up lazy imports
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                durations = list(pool.map(lambda n: run_task(n, args.links, workdir), range(args.tasks)))
+            wall = time.perf_counter() - start
+            # Drain the log queue before measuring output size
+            shutdown_logging()
+
+        output_bytes = os.path.getsize(output_path)
+        with open(output_path, encoding="utf-8", errors="replace") as f:
+            output_lines = sum(1 for _ in f)
+
+    print("🧪 LOGGING OVERHEAD BENCHMARK", file=real_stdout)
+    pages = "small pages" if args.small_pages else "corpus pages"
+    print(f"{args.tasks} tasks x {args.links} links ({pages}), {args.concurrency} threads, "
+          f"log level {args.log_level.upper()} ({args.log_format})", file=real_stdout)
+    print(f"   per-task time (median): {statistics.median(durations) * 1000:,.1f} ms", file=real_stdout)
+    print(f"   per-task time (mean):   {statistics.mean(durations) * 1000:,.1f} ms", file=real_stdout)
+    print(f"   wall time:              {wall:,.2f} s", file=real_stdout)
+    print(f"   output per task:        {output_lines / args.tasks:,.1f} lines, "
+          f"{output_bytes / args.tasks / 1024:,.1f} KiB", file=real_stdout)
+
+
+if __name__ == "__main__":
+    main()
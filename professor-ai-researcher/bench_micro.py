@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the scrape / cleaning / prompt hot paths
+Runs over the checked-in corpus in bench_corpus/, so results are repeatable:
+    python bench_micro.py                          # run and print
+    python bench_micro.py --save before.json       # keep a baseline
+    python bench_micro.py --compare before.json    # flag regressions (exit 1)
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from cleaning import combine_logs
+from llm import context_combine_prompt
+from scrape import extract_page
+
+CORPUS_DIR = Path(__file__).parent / "bench_corpus"
+HTML_DIR = CORPUS_DIR / "html"
+LOGS_DIR = CORPUS_DIR / "logs"
+
+COMBINE_LIMITS = [5000, 7500, 10000, 15000]
+
+# Each timing sample runs the operation for at least this long
+MIN_SAMPLE_SECONDS = 0.2
+SAMPLES = 5
+
+# Net block counts are small integers, so a few extra blocks are not a regression
+NET_BLOCKS_SLACK = 10
+
+
+def collect_benchmarks():
+    """name -> zero-argument callable, one per hot path and corpus input."""
+    benchmarks = {}
+
+    for html_path in sorted(HTML_DIR.glob("*.html")):
+        html = html_path.read_bytes()
+        benchmarks[f"extract_page[{html_path.stem}]"] = lambda html=html: extract_page(html, "Article_1")
+
+    for folder in sorted(p for p in LOGS_DIR.iterdir() if p.is_dir()):
+        topic = folder.name.split("_")[0]
+        for limit in COMBINE_LIMITS:
+            benchmarks[f"combine_logs[{topic},{limit}]"] = (
+                lambda folder=str(folder), limit=limit: combine_logs(folder, max_chars=limit))
+
+        context = combine_logs(str(folder))
+        benchmarks[f"context_combine_prompt[{topic}]"] = (
+            lambda context=context, topic=topic: context_combine_prompt(context, topic, "Technical", True))
+
+    return benchmarks
+
+
+def time_op(fn):
+    """Median seconds per call over SAMPLES samples (loop count auto-calibrated)."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_SECONDS:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(SAMPLES - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples)
+
+
+def memory_op(fn):
+    """(net blocks, peak KiB during the call) for one call.
+
+    Net blocks are the memory blocks allocated by the call that are still
+    alive afterwards (its result, caches, leaks), not every allocation made.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return net_blocks, (peak - base) / 1024
+
+
+def run_benchmarks(name_filter=None):
+    results = {}
+    for name, fn in collect_benchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        fn()  # warm up (lazy imports, caches)
+        seconds = time_op(fn)
+        net_blocks, peak_kib = memory_op(fn)
+        results[name] = {
+            "ops_per_sec": 1 / seconds,
+            "us_per_op": seconds * 1e6,
+            "net_blocks": net_blocks,
+            "peak_kib": peak_kib,
+        }
+        print(f"{name:<40} {1 / seconds:>12,.1f} {seconds * 1e6:>12,.1f} {net_blocks:>10} {peak_kib:>10,.1f}",
+              flush=True)
+    return results
+
+
+def compare(baseline, current, threshold):
+    """Return (name, metric, old, new, change %) for every regression beyond threshold percent.
+
+    Throughput regresses when ops/sec drops; memory regresses when peak KiB
+    grows, or when net blocks grow by more than NET_BLOCKS_SLACK as well.
+    """
+    regressions = []
+    for name, new in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+
+        drop = (old["ops_per_sec"] - new["ops_per_sec"]) * 100 / old["ops_per_sec"]
+        if drop > threshold:
+            regressions.append((name, "ops/sec", old["ops_per_sec"], new["ops_per_sec"], -drop))
+
+        if old["peak_kib"] > 0:
+            growth = (new["peak_kib"] - old["peak_kib"]) * 100 / old["peak_kib"]
+            if growth > threshold:
+                regressions.append((name, "peak KiB", old["peak_kib"], new["peak_kib"], growth))
+
+        old_blocks = old.get("net_blocks")  # missing in baselines saved before it was recorded
+        if old_blocks is not None and new["net_blocks"] - old_blocks > NET_BLOCKS_SLACK:
+            growth = (new["net_blocks"] - old_blocks) * 100 / max(old_blocks, 1)
+            if growth > threshold:
+                regressions.append((name, "net blocks", old_blocks, new["net_blocks"], growth))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default: 10)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    args = parser.parse_args()
+
+    print("🧪 MICROBENCHMARKS (frozen corpus)")
+    print(f"Python {platform.python_version()} on {platform.machine()}, corpus: {CORPUS_DIR}")
+    print("=" * 88)
+    print(f"{'benchmark':<40} {'ops/sec':>12} {'us/op':>12} {'net blocks':>10} {'peak KiB':>10}")
+    print("-" * 88)
+
+    results = run_benchmarks(args.filter)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(baseline, results, args.threshold)
+        print(f"\n📊 Compared with {args.compare} (threshold {args.threshold:.0f}%)")
+        if not regressions:
+            print("   ✅ No regressions")
+            return
+        for name, metric, old, new, change in regressions:
+            print(f"   ❌ {name}: {metric} {old:,.1f} → {new:,.1f} ({change:+.1f}%)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
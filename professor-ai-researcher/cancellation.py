@@ -0,0 +1,12 @@
+import threading
+from typing import Optional
+
+
+class TaskCancelled(Exception):
+    """Raised inside the pipeline once a task's cancel event is set."""
+
+
+def check_cancelled(cancel_event: Optional[threading.Event]):
+    """Raise TaskCancelled if cancellation was requested (no-op without an event)."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise TaskCancelled("Task was cancelled")
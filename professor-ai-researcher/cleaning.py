@@ -1,5 +1,10 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from logger import get_logger
+
+log = get_logger("cleaning")
+
 
 def combine_logs(log_folder: str, max_chars: int = 7500) -> Optional[str]:
     """Combine logs with character limit optimization for cost-effective token usage."""
@@ -14,9 +19,9 @@ def combine_logs(log_folder: str, max_chars: int = 7500) -> Optional[str]:
             
         combined_content = []
         current_length = 0
-        
-        print(f"📁 Processing {len(markdown_files)} files from {log_folder}")
-        
+
+        log.debug("Combining logs", extra={"files": len(markdown_files), "folder": log_folder})
+
         for file_path in markdown_files:
             try:
                 content = file_path.read_text(encoding='utf-8').strip()
@@ -27,29 +32,59 @@ def combine_logs(log_folder: str, max_chars: int = 7500) -> Optional[str]:
                     if remaining_chars > 200:  # Only add if we have meaningful space
                         content = content[:remaining_chars] + "\n\n[CONTENT TRUNCATED - REMAINING FILES SKIPPED]"
                         combined_content.append(content)
-                        print(f"⚠️  Truncated content at {remaining_chars} characters")
+                        log.debug("Truncated content", extra={"file": file_path.name, "kept_chars": remaining_chars})
                     break
                 
                 combined_content.append(content)
                 current_length += len(content)
-                print(f"✅ Added {file_path.name} ({len(content)} chars)")
+                log.debug("Added file", extra={"file": file_path.name, "chars": len(content)})
                 
             except Exception as e:
-                print(f"❌ Error reading {file_path.name}: {e}")
+                log.warning("Could not read log file", extra={"file": file_path.name, "error": str(e)})
                 continue
                 
         result = "\n\n" + "="*80 + "\n\n".join(combined_content) if combined_content else None
         
-        # Debug information
         if result:
-            print(f"\n📊 OPTIMIZATION RESULTS:")
-            print(f"   📏 Final context length: {len(result)} characters")
-            print(f"   📁 Files processed: {len(combined_content)}")
-            print(f"   💰 Estimated token savings: ~{((len(result) / 7500) * 100):.1f}% of original")
-            print(f"   ✅ Context optimized for cost-effective processing!")
-            
+            log.info("Combined logs", extra={"files": len(combined_content), "context_chars": len(result),
+                                             "max_chars": max_chars})
+
         return result
         
     except Exception as e:
-        print(f"❌ Error in combine_logs: {e}")
-        return None
\ No newline at end of file
+        log.error("combine_logs failed", extra={"folder": log_folder, "error": str(e)})
+        return None
+
+
+def split_chunks(content: str, max_chars: int) -> List[str]:
+    """Split content into chunks of at most max_chars, preferring line breaks."""
+    chunks = []
+    while len(content) > max_chars:
+        cut = content.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(content[:cut].strip())
+        content = content[cut:]
+    if content.strip():
+        chunks.append(content.strip())
+    return chunks
+
+
+def load_sources(log_folder: str, max_chars_per_source: int = 6000, max_sources: int = 20) -> List[str]:
+    """Load each scraped page as a separate source for map-reduce generation.
+
+    Pages longer than max_chars_per_source are split into chunks; at most
+    max_sources chunks are returned, in log order.
+    """
+    sources = []
+    for file_path in sorted(Path(log_folder).glob("*.md")):
+        try:
+            content = file_path.read_text(encoding='utf-8').strip()
+        except Exception as e:
+            log.warning("Could not read log file", extra={"file": file_path.name, "error": str(e)})
+            continue
+        sources.extend(split_chunks(content, max_chars_per_source))
+        if len(sources) >= max_sources:
+            break
+    return sources[:max_sources]
+
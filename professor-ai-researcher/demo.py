@@ -15,6 +15,7 @@ try:
     from scrape import scrape_links, initialize_logs
     from cleaning import combine_logs
     from llm import call_gemini, context_combine_prompt
+    from logger import configure_logging
 except ImportError as e:
     print(f"❌ Error importing modules: {e}")
     print("💡 Make sure all required files are in the current directory")
@@ -145,6 +146,8 @@ def interactive_demo():
 
 def main():
     """Main demo function"""
+    # The demo is read by a person, so pipeline logs are plain text lines
+    configure_logging(fmt="text")
     if len(sys.argv) > 1:
         # Use command line argument as topic
         topic = " ".join(sys.argv[1:])
@@ -1,11 +1,58 @@
 import requests
 import json
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
+from hosts import HostScoreboard, canonical_url, dedup_key, get_scoreboard
+from logger import get_logger
 
-def get_links(topic):
+log = get_logger("get_links")
+
+# Upper bound on links handed to the scraper (organic results first, then sitelinks)
+MAX_LINKS = int(os.environ.get("MAX_SOURCES", "12"))
+# Sitelinks considered per organic result
+MAX_SITELINKS_PER_RESULT = 2
+
+
+def select_links(data: dict, scoreboard: Optional[HostScoreboard] = None, max_links: int = MAX_LINKS) -> List[str]:
+    """Pick the links to scrape from a Serper response.
+
+    URLs are canonicalized and deduplicated, hosts the scoreboard knows to
+    fail or yield no text are skipped, slow/flaky hosts go to the back, and
+    sitelinks fill the remaining slots after the organic results.
+    """
+    organic, sitelinks, slow = [], [], []
+    seen = set()
+
+    def consider(url, bucket):
+        url = canonical_url(url)
+        key = dedup_key(url)
+        if key in seen:
+            return
+        seen.add(key)
+        if scoreboard and scoreboard.is_bad(url):
+            log.info("Skipping host known to fail or return no text", extra={"url": url})
+            return
+        if scoreboard and scoreboard.is_slow(url):
+            slow.append(url)
+            return
+        bucket.append(url)
+
+    for item in data.get('organic', []):
+        if item.get('link'):
+            consider(item['link'], organic)
+
+    for item in data.get('organic', []):
+        for sub in item.get('sitelinks', [])[:MAX_SITELINKS_PER_RESULT]:
+            if sub.get('link'):
+                consider(sub['link'], sitelinks)
+
+    return (organic + sitelinks + slow)[:max_links]
+
+
+def get_links(topic, scoreboard: Optional[HostScoreboard] = None):
     topic=topic.replace(" ","+")
 
 
@@ -21,11 +68,4 @@ def get_links(topic):
     response = requests.request("GET", url, headers=headers, data=payload)
 
     data = json.loads(response.text)
-    links = []
-    for item in data['organic']:
-        links.append(item['link'])
-        if "sitelinks" in item:
-            for sub in item['sitelinks']:
-                print(sub['link'])
-    return links
-
+    return select_links(data, scoreboard or get_scoreboard())
@@ -0,0 +1,182 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves still merge, but are not serialized across processes
+    fcntl = None
+
+# Where per-host fetch statistics are kept between runs
+SCOREBOARD_PATH = os.environ.get("HOST_SCOREBOARD_PATH", os.path.join("logs", "host_scores.json"))
+
+# Weight of the newest observation in the moving averages
+EMA_ALPHA = 0.3
+# Hosts are only judged after this many fetches
+MIN_SAMPLES = 3
+
+# Thresholds for skipping a host entirely
+SKIP_FAILURE_RATE = 0.7
+SKIP_MIN_TEXT_CHARS = 200
+# Statistics older than this are ignored, so a host skipped after an outage or
+# rate limit is probed again and starts a fresh record
+STATS_TTL_SECONDS = int(os.environ.get("HOST_STATS_TTL_HOURS", "24")) * 3600
+
+# Thresholds for moving a host to the back of the list
+SLOW_LATENCY_SECONDS = 5.0
+FLAKY_FAILURE_RATE = 0.3
+
+# Query parameters that only track the click and never change the page ("ref" is left alone:
+# many sites use it for content, e.g. a git ref or a docs version)
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref_src", "mc_cid", "mc_eid", "_ga", "igshid"}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL for fetching: lowercase host, no default port, fragment or tracking params."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    # Filter the raw query so the remaining parameters keep their original encoding
+    query = "&".join(
+        pair for pair in parts.query.split("&")
+        if pair and not _is_tracking_param(pair.split("=", 1)[0].lower())
+    )
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _is_tracking_param(name: str) -> bool:
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def dedup_key(url: str) -> str:
+    """Key under which two URLs count as the same page (ignores scheme, www. and trailing slash)."""
+    parts = urlsplit(canonical_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/") or "/"
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def host_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class HostScoreboard:
+    """Moving averages of fetch latency, failure rate and useful-text yield per host."""
+
+    def __init__(self, path: Optional[str] = SCOREBOARD_PATH, ttl: int = STATS_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        if self.path:
+            self.hosts = self._read()
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Merge with the file and persist atomically (no-op without a path).
+
+        The web app and batch runs share the file, so instead of the last
+        writer's scoreboard winning, each host keeps its most recently
+        updated statistics.
+        """
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock, _file_lock(self.path):
+            for host, stats in self._read().items():
+                current = self.hosts.get(host)
+                if current is None or stats.get("updated", 0) > current.get("updated", 0):
+                    self.hosts[host] = stats
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.hosts, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def record(self, url: str, latency: float, ok: bool, text_chars: Optional[int] = None):
+        """Record one fetch. text_chars is the extracted text kept (None if not extracted)."""
+        host = host_of(url)
+        if not host:
+            return
+        with self.lock:
+            stats = self.hosts.get(host)
+            failed = 0.0 if ok else 1.0
+            if stats is None or self._is_stale(stats):
+                stats = {"fetches": 0, "latency": latency, "failure_rate": failed, "text_chars": None}
+                self.hosts[host] = stats
+            else:
+                stats["latency"] += EMA_ALPHA * (latency - stats["latency"])
+                stats["failure_rate"] += EMA_ALPHA * (failed - stats["failure_rate"])
+            if text_chars is not None:
+                previous = stats["text_chars"]
+                stats["text_chars"] = text_chars if previous is None else previous + EMA_ALPHA * (text_chars - previous)
+            stats["fetches"] += 1
+            stats["updated"] = time.time()
+
+    def _is_stale(self, stats: dict) -> bool:
+        return time.time() - stats.get("updated", 0) > self.ttl
+
+    def get(self, url: str) -> Optional[dict]:
+        """Current statistics for the URL's host (None if unknown or older than the TTL)."""
+        stats = self.hosts.get(host_of(url))
+        return None if stats is None or self._is_stale(stats) else stats
+
+    def is_bad(self, url: str) -> bool:
+        """Hosts that almost always fail or yield next to no text are not worth fetching."""
+        stats = self.get(url)
+        if not stats or stats["fetches"] < MIN_SAMPLES:
+            return False
+        low_yield = stats["text_chars"] is not None and stats["text_chars"] < SKIP_MIN_TEXT_CHARS
+        return stats["failure_rate"] > SKIP_FAILURE_RATE or low_yield
+
+    def is_slow(self, url: str) -> bool:
+        """Hosts that are slow or flaky are still fetched, but after everything else."""
+        stats = self.get(url)
+        if not stats or stats["fetches"] < MIN_SAMPLES:
+            return False
+        return stats["latency"] > SLOW_LATENCY_SECONDS or stats["failure_rate"] > FLAKY_FAILURE_RATE
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on path + ".lock" across processes (where fcntl exists)."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_scoreboard = None
+_scoreboard_lock = threading.Lock()
+
+
+def get_scoreboard() -> HostScoreboard:
+    """The shared, file-backed scoreboard (loaded on first use)."""
+    global _scoreboard
+    with _scoreboard_lock:
+        if _scoreboard is None:
+            _scoreboard = HostScoreboard()
+        return _scoreboard
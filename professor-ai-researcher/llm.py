@@ -1,54 +1,97 @@
-import google.generativeai as genai
+import contextvars
+import logging
 import os
-from dotenv import load_dotenv
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
 from datetime import datetime
 
-import os
-os.environ["GRPC_VERBOSITY"] = "NONE"
+from cancellation import TaskCancelled, check_cancelled
+from logger import get_logger
+from usage import TokenUsage
 
-load_dotenv()  # make sure GOOGLE_API_KEY is in your .env file
+log = get_logger("llm")
 
-def call_gemini(prompt):
-    # configure the client with your API key
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+os.environ["GRPC_VERBOSITY"] = "NONE"
 
-    model = genai.GenerativeModel("models/gemini-2.5-flash")
-    
-    # Get model info only once at the start
-    try:
-        model_info = next(m for m in genai.list_models() if m.name == "models/gemini-2.5-flash")
-        
-        print("\n" + "="*50)
-        print("Model Information:")
-        print(f"Name: {model_info.name}")
-        print(f"Display Name: {model_info.display_name}")
-        print(f"Description: {model_info.description}")
-        print(f"Generation Methods: {', '.join(model_info.supported_generation_methods)}")
-        print("="*50 + "\n")
-    except StopIteration:
-        print("Model information not available")
-
-    response = model.generate_content(prompt)
-    
-    # Get detailed token usage
-    usage = response.usage_metadata
-    prompt_tokens = usage.prompt_token_count
-    output_tokens = usage.candidates_token_count
-    reported_total = usage.total_token_count
-    calculated_total = prompt_tokens + output_tokens
-    
-    print("\n" + "-"*50)
-    print("Token Usage Statistics:")
-    print(f"Your Prompt Tokens: {prompt_tokens}")
-    print(f"Response Tokens: {output_tokens}")
-    print(f"Visible Tokens (Prompt + Response): {calculated_total}")
-    print(f"System & Internal Tokens: {reported_total - calculated_total}")
-    print(f"Total Tokens Charged: {reported_total}")
-    print("-"*50 + "\n")
+MODEL_NAME = "models/gemini-2.5-flash"
+
+# google.generativeai takes most of the app's cold start, so it is imported
+# and configured on the first Gemini call instead of at import time
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Import genai, load .env and configure the client once, on first use."""
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            import google.generativeai as genai
+            from dotenv import load_dotenv
+
+            load_dotenv()  # make sure GOOGLE_API_KEY is in your .env file
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+            # Get model info only once at the start
+            try:
+                model_info = next(m for m in genai.list_models() if m.name == MODEL_NAME)
+                log.info("Model loaded", extra={
+                    "model": model_info.name,
+                    "display_name": model_info.display_name,
+                    "generation_methods": model_info.supported_generation_methods,
+                })
+            except StopIteration:
+                log.warning("Model information not available", extra={"model": MODEL_NAME})
+
+            _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def call_gemini(prompt, cancel_event: Optional[threading.Event] = None, usage: Optional[TokenUsage] = None):
+    """Generate a response for prompt.
+
+    Real token counts from the response's usage_metadata are added to usage
+    when one is given, so callers can bill and cap by actual consumption.
+    """
+    check_cancelled(cancel_event)
+    model = get_model()
+
+    if cancel_event is None:
+        response = model.generate_content(prompt)
+    else:
+        # Stream so generation can be abandoned as soon as the task is cancelled
+        response = model.generate_content(prompt, stream=True)
+        chunk = None
+        for chunk in response:
+            if cancel_event.is_set():
+                # The prompt and the output streamed so far are billed all the same
+                if chunk.usage_metadata is not None:
+                    record_usage(chunk.usage_metadata, usage, cancelled=True)
+                # Stop reading; dropping the response abandons the rest of the stream
+                raise TaskCancelled("Task was cancelled during generation")
     
+    record_usage(response.usage_metadata, usage)
     return response.text
 
+def record_usage(usage_metadata, usage: Optional[TokenUsage] = None, cancelled: bool = False):
+    """Log a call's token counts and add them to usage when one is given."""
+    prompt_tokens = usage_metadata.prompt_token_count
+    output_tokens = usage_metadata.candidates_token_count
+    reported_total = usage_metadata.total_token_count
+    calculated_total = prompt_tokens + output_tokens
+    if usage is not None:
+        usage.add(prompt_tokens, output_tokens, reported_total)
+
+    log.info("Gemini call cancelled" if cancelled else "Gemini call", extra={
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "internal_tokens": reported_total - calculated_total,
+        "total_tokens": reported_total,
+    })
+
 def context_combine_prompt(context_from_logs: str, topic: str, response_style: str = "Comprehensive", include_sources: bool = True) -> str:
     """
     Create a prompt that combines context from logs with a question.
@@ -64,14 +107,13 @@ def context_combine_prompt(context_from_logs: str, topic: str, response_style: s
     """
     current_date = datetime.now().strftime("%Y-%m-%d")
     
-    # Add debugging information
-    context_length = len(context_from_logs)
-    print(f"\n🔍 CONTEXT ANALYSIS:")
-    print(f"   📏 Context length: {context_length} characters")
-    print(f"   💰 Estimated tokens: ~{context_length // 4} tokens")
-    print(f"   📊 Optimization status: {'✅ OPTIMIZED' if context_length <= 7500 else '⚠️  LARGE CONTEXT'}")
-    print(f"   📄 Context preview: {context_from_logs[:200]}...")
-    
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Context analysis", extra={
+            "context_chars": len(context_from_logs),
+            "estimated_tokens": len(context_from_logs) // 4,
+            "preview": context_from_logs[:200],
+        })
+
     # Style-specific instructions
     style_instructions = {
         "Comprehensive": "Provide a thorough, well-structured answer with extensive details, examples, and explanations.",
@@ -103,5 +145,79 @@ Please provide a {response_style.lower()} answer:"""
     return prompt
 
 
+def digest_prompt(source_text: str, topic: str) -> str:
+    """Map step: condense one source (or chunk) into the facts relevant to the topic."""
+    return f"""You are a research assistant preparing notes for a later synthesis step.
+
+SOURCE:
+{source_text}
+
+INSTRUCTIONS:
+- Extract only the facts, definitions, figures and claims from this source that are relevant to the topic below
+- Keep the source URL or title next to the notes so they can be cited later
+- Use short bullet points, at most 200 words in total
+- If the source has nothing relevant, reply with exactly: NO RELEVANT CONTENT
+
+TOPIC: {topic}
+
+Notes:"""
+
+def map_reduce_generate(
+    sources: List[str],
+    topic: str,
+    response_style: str = "Comprehensive",
+    include_sources: bool = True,
+    max_workers: int = 4,
+    generate: Optional[Callable[[str], str]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    usage: Optional[TokenUsage] = None
+) -> str:
+    """
+    Answer from many sources without one oversized prompt.
+
+    Each source is digested concurrently (at most max_workers calls in
+    flight), then the digests are merged by one final synthesis call built
+    with context_combine_prompt.
+
+    Args:
+        sources (List[str]): Per-page (or per-chunk) source texts.
+        topic (str): The question or topic to ask about.
+        response_style (str): Style of the final answer.
+        include_sources (bool): Whether to include source references.
+        max_workers (int): Maximum number of concurrent digest calls.
+        generate (Callable): Prompt -> text function, defaults to call_gemini.
+        cancel_event (threading.Event): Skips remaining digests and raises TaskCancelled once set.
+        usage (TokenUsage): Accumulates real token counts of every call made.
 
+    Returns:
+        str: The synthesized answer.
+    """
+    generate = generate or partial(call_gemini, cancel_event=cancel_event, usage=usage)
+
+    def digest(source_text):
+        check_cancelled(cancel_event)
+        try:
+            return generate(digest_prompt(source_text, topic))
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            log.warning("Digest failed, skipping source", extra={"error": str(e)})
+            return None
+
+    # One context copy per digest so pool threads log with the caller's task id
+    contexts = [contextvars.copy_context() for _ in sources]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        digests = list(pool.map(lambda ctx, source: ctx.run(digest, source), contexts, sources))
+
+    notes = [
+        f"SOURCE {i} NOTES:\n{text.strip()}"
+        for i, text in enumerate(digests, 1)
+        if text and "NO RELEVANT CONTENT" not in text
+    ]
+    if not notes:
+        raise ValueError("No source produced relevant notes for this topic")
+
+    check_cancelled(cancel_event)
+    final_prompt = context_combine_prompt("\n\n".join(notes), topic, response_style, include_sources)
+    return generate(final_prompt)
 
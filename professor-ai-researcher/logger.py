@@ -0,0 +1,147 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+# DEBUG shows per-URL and per-file detail; INFO and above is the default
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for a human-readable line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+# Records waiting for the writer thread; beyond this they are dropped instead of piling up in memory
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+ROOT_LOGGER = "professor"
+
+# Task id of the research task running in the current thread (or copied context)
+current_task_id = contextvars.ContextVar("task_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "task_id"}
+
+_listener = None
+_lock = threading.Lock()
+
+
+class TaskIdFilter(logging.Filter):
+    """Stamp each record with the task id from the caller's context (unless passed in extra)."""
+
+    def filter(self, record):
+        if getattr(record, "task_id", None) is None:
+            record.task_id = current_task_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "task_id", None):
+            entry["task_id"] = record.task_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        task_id = getattr(record, "task_id", None)
+        if task_id:
+            line = f"{line} task_id={task_id}"
+        fields = [f"{k}={v}" for k, v in vars(record).items() if k not in _RECORD_FIELDS and not k.startswith("_")]
+        return " ".join([line] + fields) if fields else line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hand the record to the listener without formatting it on the calling thread.
+
+    When the queue is full (the writer is stalled) the record is dropped; the
+    next record that gets through carries the number dropped as `dropped_records`.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.dropped:
+            record.dropped_records = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped = 0
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None):
+    """Route the "professor" loggers through a queue to a background writer thread.
+
+    Callers only pay for putting a record on a bounded queue (records are
+    dropped when it is full); formatting and the write to stderr happen on
+    the listener thread. Safe to call again.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(TextFormatter() if (fmt or LOG_FORMAT) == "text" else JsonFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(TaskIdFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers[:] = [queue_handler]
+        root.setLevel((level or LOG_LEVEL).upper())
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+
+
+def ensure_logging():
+    """Configure logging from the environment unless it already is (e.g. when imported by a WSGI server)."""
+    with _lock:
+        if _listener is not None:
+            return
+    configure_logging()
+
+
+def shutdown_logging():
+    """Flush queued records, stop the writer thread and detach the queue."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT_LOGGER).handlers.clear()
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
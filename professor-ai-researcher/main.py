@@ -1,15 +1,202 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from get_links import get_links
 from scrape import scrape_links, initialize_logs
-from cleaning import combine_logs
-from llm import call_gemini,context_combine_prompt
+from cleaning import combine_logs, load_sources
+from llm import call_gemini, context_combine_prompt, map_reduce_generate
+from logger import configure_logging, current_task_id, get_logger
+
+log = get_logger("main")
+
+def read_topics(source):
+    """Read one topic per line from a file path or '-' (stdin); skip blanks and # comments."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        topics = [line.strip() for line in stream]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return [topic for topic in topics if topic and not topic.startswith("#")]
+
+
+def default_run_id(topics):
+    """Run id for checkpoints: a hash of the topic list.
+
+    Rerunning the same list resumes it, whenever that happens; a different
+    list, or an explicit --run-id (e.g. the date of a nightly run), starts fresh.
+    """
+    return "topics_" + hashlib.sha1("\n".join(topics).encode("utf-8")).hexdigest()[:8]
+
+
+def checkpoint_path(checkpoint_dir, topic):
+    safe_topic = re.sub(r"[^\w-]", "_", topic)[:50]
+    digest = hashlib.sha1(topic.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(checkpoint_dir, f"{safe_topic}_{digest}.json")
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically so an interrupt never leaves half a file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_topic(topic, checkpoint_dir, response_style="Comprehensive", map_reduce=False):
+    """Run the research pipeline for one topic, resuming from its checkpoint.
+
+    Each finished stage (search, scrape, answer) is checkpointed, so a rerun
+    after an interrupt skips the stages that already completed.
+    Returns the JSONL record for the topic (stored with the answer, so a
+    finished topic returns the same record again).
+    """
+    path = checkpoint_path(checkpoint_dir, topic)
+    state = load_checkpoint(path) or {"topic": topic, "stage": None}
+    if state["stage"] == "done":
+        return state["record"]
+    start_time = time.time()
+
+    if state["stage"] is None:
+        state["links"] = get_links(topic)
+        state["stage"] = "searched"
+        save_checkpoint(path, state)
+
+    if state["stage"] == "searched":
+        log_folder = initialize_logs(topic)
+        scrape_links(state["links"], save_logs=True, log_folder=log_folder)
+        state["log_folder"] = log_folder
+        state["stage"] = "scraped"
+        save_checkpoint(path, state)
+
+    if state["stage"] == "scraped":
+        if map_reduce:
+            sources = load_sources(state["log_folder"])
+            if not sources:
+                raise ValueError("No information found for this topic")
+            answer = map_reduce_generate(sources, topic, response_style)
+        else:
+            context_from_logs = combine_logs(state["log_folder"])
+            if not context_from_logs:
+                raise ValueError("No information found for this topic")
+            answer = call_gemini(context_combine_prompt(context_from_logs, topic, response_style))
+        state["record"] = {
+            "topic": topic,
+            "status": "completed",
+            "answer": answer,
+            "sources_count": len(state["links"]),
+            "log_folder": state["log_folder"],
+            "processing_time": round(time.time() - start_time, 2),
+        }
+        state["stage"] = "done"
+        save_checkpoint(path, state)
+
+    return state["record"]
+
+
+def run_batch(topics, output, checkpoint_dir, parallel=4, response_style="Comprehensive", map_reduce=False):
+    """Run topics with bounded parallelism, streaming one JSON line per topic to output.
+
+    Topics whose checkpoint is already done are not researched again, but
+    their stored record is written out first, so the output of a resumed run
+    holds every topic. Returns the number of topics that failed.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    write_lock = threading.Lock()
+    failures = 0
+
+    pending = []
+    for topic in dict.fromkeys(topics):
+        state = load_checkpoint(checkpoint_path(checkpoint_dir, topic))
+        if state.get("stage") == "done":
+            output.write(json.dumps(state["record"], ensure_ascii=False) + "\n")
+        else:
+            pending.append(topic)
+    output.flush()
+    skipped = len(set(topics)) - len(pending)
+    if skipped:
+        print(f"⏭️  Reusing {skipped} topics already completed in {checkpoint_dir}")
+
+    def worker(topic):
+        nonlocal failures
+        # Batch topics have no task id, so the topic itself correlates the log records
+        token = current_task_id.set(topic)
+        try:
+            record = run_topic(topic, checkpoint_dir, response_style, map_reduce)
+        except Exception as e:
+            log.error("Error researching topic", extra={"topic": topic, "error": str(e)})
+            record = {"topic": topic, "status": "error", "error": str(e)}
+        finally:
+            current_task_id.reset(token)
+        with write_lock:
+            if record["status"] == "error":
+                failures += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        list(pool.map(worker, pending))
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research one topic, or many with --batch.")
+    parser.add_argument("topic", nargs="*", help="topic to research (default: MCP)")
+    parser.add_argument("--batch", metavar="FILE", help="file with one topic per line, or - for stdin")
+    parser.add_argument("--parallel", type=int, default=4, help="topics researched at once (default: 4)")
+    parser.add_argument("--output", "-o", default="-", help="JSONL results file (overwritten), - for stdout (default)")
+    parser.add_argument("--checkpoint-dir", default="checkpoints", help="where per-topic progress is saved")
+    parser.add_argument("--run-id", help="checkpoint run to resume or start (default: hash of the topics)")
+    parser.add_argument("--style", default="Comprehensive",
+                        choices=["Comprehensive", "Concise", "Technical", "Beginner-friendly"])
+    parser.add_argument("--map-reduce", action="store_true", help="digest sources in parallel, then synthesize")
+    args = parser.parse_args()
+    configure_logging()
+
+    if not args.batch:
+        topic = " ".join(args.topic) or "MCP"
+        links = get_links(topic)
+        log_folder = initialize_logs(topic)
+        scrape_links(links, save_logs=True, log_folder=log_folder)
+        context_from_logs = combine_logs(log_folder)
+        final_prompt = context_combine_prompt(context_from_logs, topic, args.style)
+        answer = call_gemini(final_prompt)
+        print(answer)
+        return
+
+    topics = read_topics(args.batch)
+    run_id = args.run_id or default_run_id(topics)
+    checkpoint_dir = os.path.join(args.checkpoint_dir, run_id)
+    print(f"📌 Checkpoints for run {run_id} in {checkpoint_dir} (resume with --run-id {run_id})", file=sys.stderr)
+    # Every run writes all its topics, finished ones from their checkpoints
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        # Pipeline progress goes to stderr so stdout carries only JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            failures = run_batch(topics, output, checkpoint_dir, args.parallel, args.style, args.map_reduce)
+    finally:
+        if output is not sys.stdout:
+            output.close()
 
+    sys.exit(1 if failures else 0)
 
 
-topic = "MCP"
-links=get_links(topic)
-log_folder = initialize_logs(topic)
-scrape_links(links, save_logs=True, log_folder=log_folder)
-context_from_logs=combine_logs(log_folder)
-final_prompt=context_combine_prompt(context_from_logs,topic)
-answer=call_gemini(final_prompt)
-print(answer)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from cancellation import TaskCancelled
+from get_links import get_links
+from logger import get_logger
+from scrape import fetch_page
+
+log = get_logger("prefetch")
+
+# Prefetches warming at once; 0 turns prefetching off
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", "2"))
+# Top search results downloaded per prefetched topic
+PREFETCH_PAGES = int(os.environ.get("PREFETCH_PAGES", "3"))
+# Bytes of page bodies held across all prefetches, and per page
+PREFETCH_MAX_BYTES = int(os.environ.get("PREFETCH_MAX_BYTES", str(4 * 1024 * 1024)))
+PREFETCH_PAGE_BYTES = int(os.environ.get("PREFETCH_PAGE_BYTES", str(1024 * 1024)))
+# Warmed data nobody asked for again within this many seconds is dropped
+PREFETCH_TTL = int(os.environ.get("PREFETCH_TTL", "120"))
+
+# Shorter topics are still being typed and not worth a search
+MIN_TOPIC_CHARS = 3
+# How long a submitted task waits for the search of a matching prefetch (never for its pages)
+CLAIM_WAIT_SECONDS = 10
+
+
+def topic_key(topic: str) -> str:
+    """Topics match when they differ only in case and whitespace."""
+    return " ".join(topic.lower().split())
+
+
+class PrefetchEntry:
+    """Search results and top pages warmed for one topic."""
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.key = topic_key(topic)
+        self.clients = set()
+        self.last_used = time.time()
+        self.searched = threading.Event()  # links are known (or the search failed)
+        self.done = threading.Event()
+        self.cancel_event = threading.Event()
+        self.links: Optional[List[str]] = None
+        self.pages: Dict[str, tuple] = {}  # link -> (response, body, latency), as scrape_links takes them
+        self.bytes = 0
+
+    @property
+    def status(self) -> str:
+        if not self.done.is_set():
+            return "warming"
+        return "ready" if self.links is not None else "failed"
+
+
+class Prefetcher:
+    """Speculatively warms search results and pages for topics the user is typing.
+
+    Each client has at most one live prefetch: asking for a new topic evicts
+    the one it abandoned. At most `concurrency` prefetches warm at once, page
+    bodies share a `max_bytes` budget, and entries unused for `ttl` seconds
+    are evicted. A submitted task takes its entry with claim().
+    """
+
+    def __init__(self, concurrency: int = PREFETCH_CONCURRENCY, pages: int = PREFETCH_PAGES,
+                 max_bytes: int = PREFETCH_MAX_BYTES, page_bytes: int = PREFETCH_PAGE_BYTES,
+                 ttl: int = PREFETCH_TTL, search: Optional[Callable] = None, fetch: Optional[Callable] = None):
+        self.concurrency = concurrency
+        self.pages = pages
+        self.max_bytes = max_bytes
+        self.page_bytes = page_bytes
+        self.ttl = ttl
+        self.search = search or get_links
+        self.fetch = fetch or fetch_page
+        self.lock = threading.Lock()
+        self.entries: Dict[str, PrefetchEntry] = {}
+        self.client_topics: Dict[str, str] = {}  # client -> key of its live prefetch
+        self.bytes = 0  # page bytes held or reserved by in-flight downloads
+        self.warming = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    def request(self, topic: str, client: str, admit: Optional[Callable[[], None]] = None) -> str:
+        """Start warming topic for client unless it already is; returns the entry status.
+
+        admit is called before a new search starts (not for topics already
+        warming) and may raise to refuse it, e.g. UsageLedger.admit_prefetch.
+        It runs outside the prefetcher lock, and a refused client keeps its
+        previous prefetch.
+        """
+        if not self.enabled:
+            return "disabled"
+        key = topic_key(topic)
+        if len(key) < MIN_TOPIC_CHARS:
+            return "skipped"
+
+        with self.lock:
+            self._evict_expired()
+            new_search = key not in self.entries
+            if new_search:
+                if self.warming >= self.concurrency:
+                    return "busy"
+                self.warming += 1  # hold a slot while the quota is checked
+
+        if new_search and admit is not None:
+            try:
+                admit()
+            except Exception:
+                with self.lock:
+                    self.warming -= 1
+                raise
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if new_search and entry is not None:
+                self.warming -= 1  # another client started the same topic meanwhile
+            elif new_search:
+                entry = PrefetchEntry(topic)
+                self.entries[key] = entry
+                thread = threading.Thread(target=self._warm, args=(entry,))
+                thread.daemon = True
+                thread.start()
+            elif entry is None:
+                return "busy"  # evicted since the first check; the next request starts it again
+
+            previous = self.client_topics.get(client)
+            if previous and previous != key:
+                self._release_client(client, previous)
+            entry.clients.add(client)
+            entry.last_used = time.time()
+            self.client_topics[client] = key
+            return entry.status
+
+    def claim(self, topic: str, client: str, wait: float = CLAIM_WAIT_SECONDS) -> Optional[PrefetchEntry]:
+        """Take the entry client warmed for topic, with its links and the pages downloaded so far.
+
+        Waits up to `wait` seconds for a search still running, but not for
+        pages: downloads still in flight are cancelled and the caller fetches
+        those itself. The entry leaves the cache (its bytes no longer count
+        against the budget); None means there is nothing usable.
+        """
+        key = topic_key(topic)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or client not in entry.clients:
+            return None
+
+        entry.searched.wait(wait)
+        with self.lock:
+            if self.entries.get(key) is entry:
+                self._evict(key)  # no page is added to an evicted entry
+        if entry.links is None:
+            return None
+        log.info("Using prefetched topic", extra={"topic": entry.topic, "links": len(entry.links),
+                                                  "pages": len(entry.pages), "bytes": entry.bytes})
+        return entry
+
+    def evict_expired(self):
+        with self.lock:
+            self._evict_expired()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in self.entries.items() if e.last_used < cutoff]:
+            self._evict(key)
+
+    def _release_client(self, client: str, key: str):
+        """The client moved on from key; drop the entry if nobody else wants it."""
+        del self.client_topics[client]
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.clients.discard(client)
+            if not entry.clients:
+                self._evict(key)
+
+    def _evict(self, key: str):
+        entry = self.entries.pop(key)
+        entry.cancel_event.set()  # stops a download still in flight
+        self.bytes -= entry.bytes
+        for client in entry.clients:
+            if self.client_topics.get(client) == key:
+                del self.client_topics[client]
+        log.debug("Evicted prefetch", extra={"topic": entry.topic, "status": entry.status, "bytes": entry.bytes})
+
+    def _warm(self, entry: PrefetchEntry):
+        try:
+            links = self.search(entry.topic)
+            # A task submitted now can start from the links while the pages download
+            entry.links = links
+            entry.searched.set()
+            for link in links[:self.pages]:
+                # Reserve the most this page may take so concurrent prefetches cannot overshoot
+                with self.lock:
+                    limit = min(self.page_bytes, self.max_bytes - self.bytes)
+                    if entry.cancel_event.is_set() or limit <= 0:
+                        break
+                    self.bytes += limit
+
+                body = None
+                start = time.perf_counter()
+                try:
+                    response, body = self.fetch(link, cancel_event=entry.cancel_event, max_bytes=limit)
+                    if response.status_code != 200:
+                        body = None
+                except TaskCancelled:
+                    pass
+                except Exception as e:
+                    log.debug("Prefetch of page failed", extra={"url": link, "error": str(e)})
+
+                with self.lock:
+                    self.bytes -= limit
+                    if body is not None and self.entries.get(entry.key) is entry:
+                        entry.pages[link] = (response, body, time.perf_counter() - start)
+                        entry.bytes += len(body)
+                        self.bytes += len(body)
+        except Exception as e:
+            log.warning("Prefetch failed", extra={"topic": entry.topic, "error": str(e)})
+        finally:
+            with self.lock:
+                self.warming -= 1
+            entry.searched.set()
+            entry.done.set()
+            log.debug("Prefetch finished", extra={"topic": entry.topic, "pages": len(entry.pages),
+                                                  "bytes": entry.bytes})
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import time
+from typing import List, Optional
+
+from cancellation import TaskCancelled
+from hosts import HostScoreboard, get_scoreboard
+from logger import get_logger
+from scrape import (
+    fetch_page, extract_page, page_filename, page_markdown, content_hash,
+    page_record, report_boilerplate, write_manifest, load_manifest
+)
+
+log = get_logger("refresh")
+
+# Answer generated for a run, keyed by the context it was generated from
+ANSWER_NAME = "answer.json"
+
+TIMESTAMP_PATTERN = r"_\d{8}_\d{6}$"
+
+
+def find_previous_run(topic: str, logs_dir: str = "logs", exclude: Optional[str] = None) -> Optional[str]:
+    """Return the most recent logs/<topic>_<timestamp> folder for topic, if any."""
+    if not os.path.isdir(logs_dir):
+        return None
+
+    pattern = re.compile(re.escape(topic) + TIMESTAMP_PATTERN)
+    exclude = os.path.abspath(exclude) if exclude else None
+
+    runs = []
+    for name in os.listdir(logs_dir):
+        path = os.path.join(logs_dir, name)
+        if pattern.fullmatch(name) and os.path.isdir(path) and os.path.abspath(path) != exclude:
+            runs.append(name)
+
+    # Timestamps are zero-padded, so the latest run sorts last
+    return os.path.join(logs_dir, max(runs)) if runs else None
+
+
+def _reuse_page(previous_folder: str, record: dict, log_folder: str, i: int) -> dict:
+    """Copy a previously extracted page into the new run under its new index."""
+    filename = page_filename(i, record["title"])
+    shutil.copyfile(os.path.join(previous_folder, record["file"]), os.path.join(log_folder, filename))
+    return dict(record, file=filename)
+
+
+def refresh_links(links: List[str], log_folder: str, previous_folder: str,
+                  cancel_event: Optional[threading.Event] = None,
+                  scoreboard: Optional[HostScoreboard] = None) -> dict:
+    """Scrape links into log_folder, reusing what previous_folder already has.
+
+    New URLs are fetched, known URLs are revalidated with If-None-Match /
+    If-Modified-Since, and pages whose extracted text did not change are
+    copied over untouched so the combined context stays byte-identical.
+    Returns counts of new, changed, unchanged, failed and dropped URLs.
+    """
+    previous = load_manifest(previous_folder)
+    previous_pages = previous.get("pages", {})
+
+    stats = {
+        "new": 0, "changed": 0, "unchanged": 0, "failed": 0,
+        "dropped": len(set(previous.get("links", [])) - set(links)),
+    }
+    pages = {}
+    scoreboard = scoreboard or get_scoreboard()
+
+    for i, link in enumerate(links, 1):
+        record = previous_pages.get(link)
+        if record and not os.path.exists(os.path.join(previous_folder, record["file"])):
+            record = None
+
+        headers = {}
+        if record:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+
+        start = time.perf_counter()
+        try:
+            response, body = fetch_page(link, headers=headers, cancel_event=cancel_event)
+            latency = time.perf_counter() - start
+
+            if response.status_code == 304 and record:
+                scoreboard.record(link, latency, ok=True)
+                pages[link] = _reuse_page(previous_folder, record, log_folder, i)
+                stats["unchanged"] += 1
+                log.debug("Not modified, reused page", extra={"url": link})
+                continue
+
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+
+            title_text, content_text, removed_chars = extract_page(body, f"Article_{i}")
+            scoreboard.record(link, latency, ok=True, text_chars=len(content_text))
+
+            if record and content_hash(content_text) == record["content_hash"]:
+                reused = _reuse_page(previous_folder, record, log_folder, i)
+                # Keep the fresh validators so the next refresh can get a 304
+                pages[link] = dict(reused, etag=response.headers.get("ETag"),
+                                   last_modified=response.headers.get("Last-Modified"))
+                stats["unchanged"] += 1
+                log.debug("Content unchanged, reused page", extra={"url": link})
+                continue
+
+            filename = page_filename(i, title_text)
+            with open(os.path.join(log_folder, filename), "w", encoding="utf-8") as f:
+                f.write(page_markdown(title_text, link, content_text))
+            pages[link] = page_record(filename, title_text, content_text, response, removed_chars)
+            stats["changed" if record else "new"] += 1
+            log.debug("Scraped page", extra={"url": link, "latency_ms": round(latency * 1000)})
+            report_boilerplate(link, content_text, removed_chars)
+
+        except TaskCancelled:
+            scoreboard.save()
+            raise
+        except Exception as e:
+            scoreboard.record(link, time.perf_counter() - start, ok=False)
+            if record:
+                # A stale copy is better than losing the source entirely
+                pages[link] = _reuse_page(previous_folder, record, log_folder, i)
+            stats["failed"] += 1
+            log.warning("Failed to refresh page", extra={"url": link, "error": str(e)})
+
+    scoreboard.save()
+    write_manifest(log_folder, links, pages)
+    log.info("Refreshed links", extra={"links": len(links), "folder": log_folder, **stats})
+    return stats
+
+
+def answer_key(context: str, topic: str, response_style: str = "Comprehensive", include_sources: bool = True,
+               mode: str = "single") -> str:
+    """Identify an answer by everything that shapes the prompt except the date."""
+    key = json.dumps([context, topic, response_style, include_sources, mode])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def save_answer(log_folder: str, key: str, answer: str):
+    with open(os.path.join(log_folder, ANSWER_NAME), "w", encoding="utf-8") as f:
+        json.dump({"key": key, "answer": answer}, f)
+
+
+def load_cached_answer(log_folder: Optional[str], key: str) -> Optional[str]:
+    """Return the answer stored in log_folder if it was generated for the same key."""
+    if not log_folder:
+        return None
+    try:
+        with open(os.path.join(log_folder, ANSWER_NAME), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved["answer"] if saved.get("key") == key else None
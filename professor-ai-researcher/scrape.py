@@ -2,9 +2,18 @@ import requests
 from get_links import get_links
 import os
 from datetime import datetime
-from bs4 import BeautifulSoup
 import re
-from typing import List, Optional
+import json
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional
+
+from cancellation import TaskCancelled, check_cancelled
+from hosts import HostScoreboard, get_scoreboard
+from logger import get_logger
+
+log = get_logger("scrape")
 
 
 def initialize_logs(topic):
@@ -20,77 +29,258 @@ def initialize_logs(topic):
 
     return topic_folder
 
-def scrape_links(links: List[str], save_logs: bool = True, log_folder: Optional[str] = None) -> Optional[str]:
+# Per-run record of what was scraped, used by refresh.py to revalidate pages
+MANIFEST_NAME = "manifest.json"
+
+# Downloads are read in chunks so a cancelled task stops mid-response
+FETCH_CHUNK_SIZE = 64 * 1024
+
+CONTENT_SELECTORS = [
+    "article", "main", "content",
+    ".post-content", ".entry-content", ".article-content", "body"
+]
+
+
+def fetch_page(link: str, headers: Optional[dict] = None, cancel_event: Optional[threading.Event] = None,
+               max_bytes: Optional[int] = None):
+    """GET a page, checking cancel_event between body chunks.
+
+    Returns (response, body). Raises TaskCancelled as soon as the event is
+    set, closing the connection instead of finishing the download. Raises
+    ValueError once the body grows past max_bytes (when given).
+    """
+    check_cancelled(cancel_event)
+    response = requests.get(link, timeout=10, headers=headers, stream=True)
+    try:
+        body = b""
+        if response.status_code == 200:
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+                check_cancelled(cancel_event)
+                chunks.append(chunk)
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"Page is larger than {max_bytes} bytes")
+            body = b"".join(chunks)
+        return response, body
+    finally:
+        response.close()
+
+
+# ----- Boilerplate removal -----
+# Elements that never carry article text
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "footer", "aside", "form", "iframe", "svg", "button"]
+
+# Leaf text blocks scored for link density; headings and code are always kept
+BLOCK_TAGS = ["p", "li", "div", "section", "td", "th", "dd", "dt", "blockquote", "figcaption",
+              "h1", "h2", "h3", "h4", "h5", "h6", "pre"]
+KEEP_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "pre"}
+
+# A block whose text is mostly link text is a menu, link list or "related" box
+MAX_LINK_DENSITY = 0.5
+# Short blocks are dropped at a lower density (e.g. "Home | Blog | About")
+SHORT_BLOCK_CHARS = 80
+MAX_SHORT_LINK_DENSITY = 0.2
+# Menus and link lists have several links; a sentence with one inline citation is prose
+MIN_DENSITY_LINKS = 2
+# Short blocks with links matching these are cookie banners, sign-up prompts and footers
+BOILERPLATE_PATTERN = re.compile(
+    r"\b(we use cookies|accept (all )?cookies|cookie (settings|policy|preferences)|"
+    r"subscribe to (our|the) newsletter|sign up for|all rights reserved|privacy policy|"
+    r"terms of (use|service)|share (this|on)|skip to (main )?content)\b|©",
+    re.IGNORECASE
+)
+BOILERPLATE_MAX_CHARS = 200
+
+
+def strip_boilerplate(content) -> int:
+    """Remove low-value blocks from a BeautifulSoup element in place.
+
+    Blocks with several links are scored by link density (link text / block
+    text); link-heavy blocks and short cookie/sign-up/footer lines that carry
+    links are dropped.
+    Prose without links is never dropped for its wording alone.
+    Returns the number of characters removed.
+    """
+    removed_chars = 0
+
+    for element in content(BOILERPLATE_TAGS):
+        if element.parent is None:
+            continue  # already removed with an enclosing element
+        removed_chars += len(element.get_text(" ", strip=True))
+        element.decompose()
+
+    for block in content.find_all(BLOCK_TAGS):
+        if block.name in KEEP_TAGS or block.find(BLOCK_TAGS):
+            continue  # only score leaf blocks, their parents keep the remaining text
+
+        text = block.get_text(" ", strip=True)
+        if not text:
+            continue
+
+        links = block.find_all("a")
+        link_chars = sum(len(a.get_text(" ", strip=True)) for a in links)
+        link_density = link_chars / len(text) if len(links) >= MIN_DENSITY_LINKS else 0
+        is_short = len(text) < SHORT_BLOCK_CHARS
+
+        if (link_density > MAX_LINK_DENSITY
+                or (is_short and link_density > MAX_SHORT_LINK_DENSITY)
+                or (link_chars and len(text) < BOILERPLATE_MAX_CHARS and BOILERPLATE_PATTERN.search(text))):
+            removed_chars += len(text)
+            block.decompose()
+
+    return removed_chars
+
+
+def extract_page(html, fallback_title: str):
+    """Extract (title, text, removed_chars) from an HTML document.
+
+    removed_chars counts the boilerplate dropped by strip_boilerplate.
+    """
+    # bs4 is only needed once we actually scrape, keep it off the import path
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # ----- Title -----
+    title_tag = soup.find("title")
+    title_text = title_tag.get_text(strip=True) if title_tag else fallback_title
+
+    # ----- Content -----
+    content_text = ""
+    removed_chars = 0
+    for selector in CONTENT_SELECTORS:
+        content = soup.select_one(selector)
+        if content:
+            removed_chars = strip_boilerplate(content)
+            content_text = content.get_text(separator="\n", strip=True)
+            break
+    if not content_text:
+        removed_chars += strip_boilerplate(soup)
+        content_text = soup.get_text(separator="\n", strip=True)
+
+    return title_text, content_text, removed_chars
+
+
+def page_filename(i: int, title_text: str) -> str:
+    """Numbered, filesystem-safe markdown filename for a page."""
+    safe_title = re.sub(r"[^\w\s-]", "", title_text)
+    safe_title = re.sub(r"\s+", "_", safe_title).strip("_")
+    return f"{i:03d}_{safe_title}.md"
+
+
+def page_markdown(title_text: str, link: str, content_text: str) -> str:
+    markdown_content = f"# {title_text}\n\n"
+    markdown_content += f"**Source**: {link}\n\n"
+    markdown_content += f"**Scraped on**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    markdown_content += f"---\n\n"
+    markdown_content += f"{content_text}"
+    return markdown_content
+
+
+def content_hash(content_text: str) -> str:
+    return hashlib.sha256(content_text.encode("utf-8")).hexdigest()
+
+
+def report_boilerplate(link: str, content_text: str, removed_chars: int):
+    total = len(content_text) + removed_chars
+    removed_pct = (removed_chars * 100 / total) if total else 0
+    log.debug("Stripped boilerplate", extra={"url": link, "kept_chars": len(content_text),
+                                             "removed_chars": removed_chars, "removed_pct": round(removed_pct)})
+
+
+def page_record(filename: str, title_text: str, content_text: str, response, removed_chars: int = 0) -> dict:
+    """Manifest entry for a saved page, including HTTP validators for revalidation."""
+    return {
+        "file": filename,
+        "title": title_text,
+        "content_hash": content_hash(content_text),
+        "retained_chars": len(content_text),
+        "removed_chars": removed_chars,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def write_manifest(log_folder: str, links: List[str], pages: Dict[str, dict]):
+    with open(os.path.join(log_folder, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"links": links, "pages": pages}, f, indent=2)
+
+
+def load_manifest(log_folder: str) -> dict:
+    """Load a run's manifest; runs scraped before manifests existed return {}."""
+    try:
+        with open(os.path.join(log_folder, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def scrape_links(links: List[str], save_logs: bool = True, log_folder: Optional[str] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 scoreboard: Optional[HostScoreboard] = None,
+                 prefetched: Optional[Dict[str, tuple]] = None) -> Optional[str]:
     """Scrape content from a list of links.
     Args:
         links (List[str]): List of URLs to scrape.
         save_logs (bool): Whether to save each page as a markdown file.
         log_folder (Optional[str]): Folder to save logs. If None, logs won't be saved.
+        cancel_event (Optional[threading.Event]): Stops scraping (raises TaskCancelled) once set.
+        scoreboard (Optional[HostScoreboard]): Records per-host latency, failures and text yield.
+        prefetched (Optional[Dict[str, tuple]]): link -> (response, body, latency) fetched ahead of
+            time (see prefetch.py); these links are not downloaded again.
     Returns:
     if save_logs is False, returns combined content as a string.
     if save_logs is True, returns None.
     """
     combined_content = ""
+    pages = {}
+    scoreboard = scoreboard or get_scoreboard()
 
 
     # ✅ enumerate gives us both index and URL
     for i, link in enumerate(links, 1):
+        start = time.perf_counter()
         try:
-            response = requests.get(link, timeout=10)
-            if response.status_code == 200:
-                print(f"Successfully scraped {link}")
-
-                soup = BeautifulSoup(response.content, "html.parser")
-
-                # ----- Title -----
-                title_tag = soup.find("title")
-                title_text = title_tag.get_text(strip=True) if title_tag else f"Article_{i}"
-
-                # Clean title for filename
-                safe_title = re.sub(r"[^\w\s-]", "", title_text)
-                safe_title = re.sub(r"\s+", "_", safe_title).strip("_")
-
-                # ----- Content -----
-                content_selectors = [
-                    "article", "main", "content",
-                    ".post-content", ".entry-content", ".article-content", "body"
-                ]
-                content_text = ""
-                for selector in content_selectors:
-                    content = soup.select_one(selector)
-                    if content:
-                        for script in content(["script", "style"]):
-                            script.decompose()
-                        content_text = content.get_text(separator="\n", strip=True)
-                        break
-                if not content_text:
-                    content_text = soup.get_text(separator="\n", strip=True)
-
-                # ----- Markdown -----
-                markdown_content=f"# {title_text}\n\n"
-                markdown_content += f"**Source**: {link}\n\n"
-                markdown_content += f"**Scraped on**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                markdown_content += f"---\n\n"
-                markdown_content += f"{content_text}"
-                
+            if prefetched and link in prefetched:
+                check_cancelled(cancel_event)
+                response, body, latency = prefetched[link]
+            else:
+                response, body = fetch_page(link, cancel_event=cancel_event)
+                latency = time.perf_counter() - start
+            if response.status_code != 200:
+                scoreboard.record(link, latency, ok=False)
+                log.debug("Fetch failed", extra={"url": link, "status": response.status_code})
+            else:
+                log.debug("Scraped page", extra={"url": link, "latency_ms": round(latency * 1000)})
 
+                title_text, content_text, removed_chars = extract_page(body, f"Article_{i}")
+                report_boilerplate(link, content_text, removed_chars)
+                scoreboard.record(link, latency, ok=True, text_chars=len(content_text))
+                markdown_content = page_markdown(title_text, link, content_text)
 
                 # Save to file if requested
                 if save_logs and log_folder:
-                    filename = f"{i:03d}_{safe_title}.md"
+                    filename = page_filename(i, title_text)
                     filepath = os.path.join(log_folder, filename)
                     with open(filepath, "w", encoding="utf-8") as f:
                         f.write(markdown_content)
-                    print(f"Saved → {filepath}")
+                    pages[link] = page_record(filename, title_text, content_text, response, removed_chars)
+                    log.debug("Saved page", extra={"url": link, "path": filepath})
                 else:
                     combined_content += markdown_content + "\n\n---\n\n"
                     
+        except TaskCancelled:
+            scoreboard.save()
+            raise
         except Exception as e:
-            print(f"failed to scrape {link}: {str(e)}")
+            scoreboard.record(link, time.perf_counter() - start, ok=False)
+            log.warning("Failed to scrape page", extra={"url": link, "error": str(e)})
+    scoreboard.save()
     if save_logs and log_folder:
-        print(f"All pages saved in folder: {log_folder}")
+        write_manifest(log_folder, links, pages)
+        log.info("Scraped links", extra={"links": len(links), "saved": len(pages), "folder": log_folder})
         return None
     else:
         return combined_content
-
-
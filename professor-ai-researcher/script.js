@@ -1,7 +1,16 @@
 // Global variables
 let isProcessing = false;
 let processingStartTime = null;
+let currentTaskId = null;
 let currentStep = 0;
+
+// Speculative prefetch (opt-in): warm search and top pages once typing pauses
+const PREFETCH_DEBOUNCE_MS = 600;
+const PREFETCH_MIN_CHARS = 3;
+let prefetchTimeout = null;
+let prefetchController = null;
+let lastPrefetchedTopic = '';
+let prefetchPausedUntil = 0;
 let processingSteps = [
     { title: "Searching Web Sources", description: "Finding relevant information across the internet" },
     { title: "Scraping Content", description: "Extracting valuable data from discovered sources" },
@@ -18,6 +27,7 @@ const elements = {
     topicInput: document.getElementById('topicInput'),
     responseStyle: document.getElementById('responseStyle'),
     includeSources: document.getElementById('includeSources'),
+    prefetchToggle: document.getElementById('prefetchToggle'),
     generateBtn: document.getElementById('generateBtn'),
     voiceBtn: document.getElementById('voiceBtn'),
     processingTitle: document.getElementById('processingTitle'),
@@ -48,6 +58,9 @@ function initializeApp() {
     // Focus on input
     elements.topicInput.focus();
     
+    // Restore the prefetch opt-in
+    elements.prefetchToggle.checked = localStorage.getItem('prefetchWhileTyping') === 'true';
+    
     // Initialize voice recognition if available
     if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
         setupVoiceRecognition();
@@ -67,6 +80,13 @@ function setupEventListeners() {
         }
     });
     
+    // Prefetch the likely topic while typing
+    elements.topicInput.addEventListener('input', schedulePrefetch);
+    elements.prefetchToggle.addEventListener('change', function() {
+        localStorage.setItem('prefetchWhileTyping', this.checked);
+        schedulePrefetch();
+    });
+    
     // Voice button
     elements.voiceBtn.addEventListener('click', startVoiceRecognition);
     
@@ -136,6 +156,10 @@ async function handleGenerate() {
     isProcessing = true;
     processingStartTime = Date.now();
     
+    // The submitted topic takes over from any prefetch still waiting to be sent
+    clearTimeout(prefetchTimeout);
+    lastPrefetchedTopic = '';
+    
     // Show processing section with animation
     showProcessingSection();
     
@@ -155,6 +179,60 @@ async function handleGenerate() {
     }
 }
 
+function schedulePrefetch() {
+    clearTimeout(prefetchTimeout);
+    
+    const topic = elements.topicInput.value.trim();
+    const saveData = navigator.connection && navigator.connection.saveData;
+    if (!elements.prefetchToggle.checked || saveData || isProcessing || topic.length < PREFETCH_MIN_CHARS
+            || Date.now() < prefetchPausedUntil) {
+        return;
+    }
+    if (topic.toLowerCase() === lastPrefetchedTopic) {
+        return;
+    }
+    
+    prefetchTimeout = setTimeout(() => prefetchTopic(topic), PREFETCH_DEBOUNCE_MS);
+}
+
+async function prefetchTopic(topic) {
+    // Only the latest topic matters; the server also drops this client's previous prefetch
+    if (prefetchController) {
+        prefetchController.abort();
+    }
+    prefetchController = new AbortController();
+    lastPrefetchedTopic = topic.toLowerCase();
+    
+    try {
+        const response = await fetch('/api/prefetch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ topic: topic, session: getPrefetchSession() }),
+            signal: prefetchController.signal
+        });
+        
+        // Out of prefetch quota: stay quiet until the server says to retry
+        if (response.status === 429) {
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 60;
+            prefetchPausedUntil = Date.now() + retryAfter * 1000;
+        }
+    } catch (error) {
+        // Best effort: without a prefetch the research request does the work itself
+    }
+}
+
+// Random per-tab id so the server can tell apart users sharing one address
+function getPrefetchSession() {
+    let session = sessionStorage.getItem('prefetchSession');
+    if (!session) {
+        session = window.crypto && crypto.randomUUID ? crypto.randomUUID() : Math.random().toString(36).slice(2);
+        sessionStorage.setItem('prefetchSession', session);
+    }
+    return session;
+}
+
 function showProcessingSection() {
     elements.searchSection.classList.add('hidden');
     elements.resultsSection.classList.add('hidden');
@@ -180,7 +258,9 @@ async function simulateResearchProcess(topic) {
             body: JSON.stringify({
                 topic: topic,
                 response_style: elements.responseStyle.value,
-                include_sources: elements.includeSources.checked
+                include_sources: elements.includeSources.checked,
+                // Lets the server hand this task the prefetch warmed for the same session
+                session: getPrefetchSession()
             })
         });
         
@@ -190,9 +270,14 @@ async function simulateResearchProcess(topic) {
         
         const data = await response.json();
         const taskId = data.task_id;
+        currentTaskId = taskId;
         
         // Poll for status updates
-        await pollTaskStatus(taskId);
+        try {
+            await pollTaskStatus(taskId);
+        } finally {
+            currentTaskId = null;
+        }
         
     } catch (error) {
         console.error('Error starting research:', error);
@@ -231,7 +316,7 @@ async function pollTaskStatus(taskId) {
                     window.currentResult = status.result;
                     window.currentMetadata = status.metadata;
                     resolve();
-                } else if (status.status === 'error') {
+                } else if (status.status === 'error' || status.status === 'cancelled') {
                     reject(new Error(status.error || 'Research failed'));
                 } else {
                     // Continue polling
@@ -749,6 +834,13 @@ document.addEventListener('keydown', function(e) {
     }
 });
 
+// Cancel the running task when the page is closed so the server stops scraping
+window.addEventListener('pagehide', function() {
+    if (currentTaskId) {
+        fetch(`/api/research/${currentTaskId}`, { method: 'DELETE', keepalive: true });
+    }
+});
+
 // Performance optimization: Throttle resize events
 let resizeTimeout;
 window.addEventListener('resize', function() {
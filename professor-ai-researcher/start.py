@@ -8,21 +8,33 @@ import sys
 import subprocess
 import webbrowser
 import time
+import importlib.util
 from pathlib import Path
 
+# Cold-start budget for `import app` (cumulative -X importtime, microseconds).
+# Heavy modules (google.generativeai, bs4) must stay off this path.
+COLD_START_BUDGET_US = int(os.environ.get('COLD_START_BUDGET_MS', '800')) * 1000
+
 def check_requirements():
-    """Check if all required packages are installed"""
-    required_packages = [
-        'flask', 'flask_cors', 'requests', 'beautifulsoup4', 
-        'python-dotenv', 'google-generativeai'
-    ]
+    """Check if all required packages are installed (without importing them)"""
+    # pip package name -> importable module name
+    required_packages = {
+        'flask': 'flask',
+        'flask-cors': 'flask_cors',
+        'requests': 'requests',
+        'beautifulsoup4': 'bs4',
+        'python-dotenv': 'dotenv',
+        'google-generativeai': 'google.generativeai',
+    }
     
     missing_packages = []
     
-    for package in required_packages:
+    for package, module in required_packages.items():
         try:
-            __import__(package.replace('-', '_'))
+            found = importlib.util.find_spec(module) is not None
         except ImportError:
+            found = False
+        if not found:
             missing_packages.append(package)
     
     if missing_packages:
@@ -30,11 +42,51 @@ def check_requirements():
         for package in missing_packages:
             print(f"   - {package}")
         print("\n💡 Install missing packages with:")
-        print("   pip install -r requirement.txt")
+        print("   pip install -r requirements.txt")
         return False
     
     return True
 
+def import_time_report(module='app'):
+    """Import module in a fresh interpreter with -X importtime.
+
+    Returns (total_us, rows) where rows are (cumulative_us, self_us, name)
+    sorted by cumulative time, slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total_us = next((cum for cum, _, name in rows if name.strip() == module), 0)
+    rows.sort(reverse=True)
+    return total_us, rows
+
+def print_import_time_report(module='app', top=15):
+    """Print the slowest imports of module and compare against the cold-start budget"""
+    total_us, rows = import_time_report(module)
+    
+    print(f"⏱️  Import time report for '{module}'")
+    print("-" * 50)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    print("-" * 50)
+    
+    within_budget = total_us <= COLD_START_BUDGET_US
+    status = "✅ within" if within_budget else "❌ over"
+    print(f"{status} budget: {total_us / 1000:.1f} ms (budget {COLD_START_BUDGET_US / 1000:.0f} ms)")
+    return within_budget
+
 def check_env_file():
     """Check if .env file exists and has required keys"""
     env_file = Path('.env')
@@ -108,6 +160,9 @@ def main():
     print("🧠 Professor AI Research Assistant")
     print("=" * 40)
     
+    if '--importtime' in sys.argv:
+        sys.exit(0 if print_import_time_report() else 1)
+    
     # Check requirements
     print("🔍 Checking requirements...")
     
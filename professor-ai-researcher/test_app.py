@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Tests for the Flask web layer (static assets and API responses)
+Run with: python -m pytest test_app.py
+"""
+
+import gzip
+import json
+
+import pytest
+
+import app as app_module
+from app import app, ResearchTask, process_research_task
+from assets import assets
+
+
+@pytest.fixture(autouse=True)
+def fresh_active_tasks(monkeypatch):
+    """Give every test its own task registry so tasks never leak between tests"""
+    monkeypatch.setattr(app_module, 'active_tasks', {})
+
+
+def make_client():
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def make_completed_task(task_id='task-1'):
+    task = ResearchTask(task_id, 'MCP')
+    task.status = 'completed'
+    task.progress = 100
+    task.result = '# Model Context Protocol\n\n' + 'MCP connects tools to models. ' * 200
+    app_module.active_tasks[task_id] = task
+    return task
+
+
+def test_index_uses_fingerprinted_assets():
+    client = make_client()
+    html = client.get('/').get_data(as_text=True)
+
+    assert assets['style.css'].url in html
+    assert assets['script.js'].url in html
+    assert 'href="style.css"' not in html
+
+
+def test_fingerprinted_asset_is_immutable_and_compressed():
+    client = make_client()
+    asset = assets['script.js']
+
+    response = client.get(asset.url, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.data) == asset.bodies['identity']
+
+
+def test_asset_conditional_request_returns_304():
+    client = make_client()
+    asset = assets['style.css']
+
+    first = client.get(asset.url, headers={'Accept-Encoding': 'identity'})
+    etag = first.headers['ETag']
+    second = client.get(asset.url, headers={'Accept-Encoding': 'identity', 'If-None-Match': etag})
+
+    assert second.status_code == 304
+    assert second.data == b''
+
+
+def test_changed_asset_is_swapped_not_modified(monkeypatch, tmp_path):
+    import os
+
+    from assets import StaticAsset
+
+    path = tmp_path / 'script.js'
+    path.write_text('console.log("v1");', encoding='utf-8')
+    old = StaticAsset('script.js', str(path), 'application/javascript')
+    monkeypatch.setitem(assets, 'script.js', old)
+    old_digest, old_bodies = old.digest, old.bodies
+
+    path.write_text('console.log("v2");', encoding='utf-8')
+    os.utime(path, (old.mtime + 10, old.mtime + 10))
+    response = make_client().get('/script.js', headers={'Accept-Encoding': 'identity'})
+
+    # A request still holding the old version keeps a matching digest and body
+    assert old.digest == old_digest and old.bodies is old_bodies
+    assert assets['script.js'] is not old
+    assert response.data == b'console.log("v2");'
+    assert response.headers['ETag'] == f'"{assets["script.js"].digest}-identity"'
+
+
+def test_stale_fingerprint_is_not_found():
+    client = make_client()
+    assert client.get('/assets/style.000000000000.css').status_code == 404
+
+
+def test_plain_asset_url_revalidates():
+    client = make_client()
+    response = client.get('/style.css')
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'ETag' in response.headers
+
+
+def test_status_is_compressed_when_accepted():
+    client = make_client()
+    task = make_completed_task()
+
+    response = client.get(f'/api/research/{task.task_id}/status', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    payload = json.loads(gzip.decompress(response.data))
+    assert payload['result'] == task.result
+
+
+def test_unchanged_task_returns_304():
+    client = make_client()
+    task = make_completed_task()
+    url = f'/api/research/{task.task_id}/result'
+
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    task.result += '\nUpdated.'
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_fields_filter_skips_result_body():
+    client = make_client()
+    task = make_completed_task()
+
+    payload = client.get(f'/api/research/{task.task_id}/status?fields=status,progress').get_json()
+
+    assert payload == {'task_id': task.task_id, 'status': 'completed', 'progress': 100}
+
+
+def test_delete_cancels_running_task():
+    client = make_client()
+    task = ResearchTask('task-running', 'MCP')
+    task.status = 'scraping'
+    app_module.active_tasks[task.task_id] = task
+
+    response = client.delete(f'/api/research/{task.task_id}')
+
+    assert response.status_code == 202
+    assert task.cancel_event.is_set()
+
+
+def test_delete_finished_task_conflicts():
+    client = make_client()
+    task = make_completed_task('task-done')
+
+    assert client.delete(f'/api/research/{task.task_id}').status_code == 409
+    assert client.delete('/api/research/missing').status_code == 404
+
+
+def test_cancelled_task_stops_before_scraping(monkeypatch):
+    task = ResearchTask('task-cancel', 'MCP')
+    scraped = []
+
+    def fake_get_links(topic):
+        task.cancel_event.set()  # client cancels while search is in flight
+        return ['https://example.com']
+
+    monkeypatch.setattr(app_module, 'get_links', fake_get_links)
+    monkeypatch.setattr(app_module, 'scrape_links', lambda *args, **kwargs: scraped.append(args))
+
+    process_research_task(task)
+
+    assert task.status == 'cancelled'
+    assert scraped == []
+
+
+class IdleTimer:
+    """Stands in for threading.Timer so cancel_idle_tasks does not reschedule itself"""
+    def __init__(self, interval, function):
+        pass
+
+    def start(self):
+        pass
+
+
+def test_idle_tasks_are_cancelled(monkeypatch):
+    monkeypatch.setattr(app_module.threading, 'Timer', IdleTimer)
+    task = ResearchTask('task-idle', 'MCP')
+    task.status = 'scraping'
+    task.last_checked -= app_module.TASK_IDLE_TIMEOUT + 1
+    app_module.active_tasks[task.task_id] = task
+
+    app_module.cancel_idle_tasks()
+
+    assert task.cancel_event.is_set()
+
+
+def test_quota_rejects_requests_over_limit(monkeypatch):
+    from usage import UsageLedger
+    keys = {'sk-a': {'label': 'team-a', 'requests': 1}, 'sk-b': {'label': 'team-b', 'requests': 1}}
+    monkeypatch.setattr(app_module, 'usage_ledger', UsageLedger(path=None, overrides=keys))
+    monkeypatch.setattr(app_module, 'process_research_task', lambda task: None)
+    client = make_client()
+
+    assert client.post('/api/research', json={'topic': 'MCP'}, headers={'X-API-Key': 'sk-a'}).status_code == 200
+    rejected = client.post('/api/research', json={'topic': 'MCP'}, headers={'X-API-Key': 'sk-a'})
+    assert rejected.status_code == 429
+    assert int(rejected.headers['Retry-After']) > 0
+    assert rejected.get_json()['client'] == 'team-a'
+    assert b'sk-a' not in rejected.data
+
+    # Other clients have their own quota
+    assert client.post('/api/research', json={'topic': 'MCP'}, headers={'X-API-Key': 'sk-b'}).status_code == 200
+
+
+def test_unknown_keys_cannot_bypass_quota(monkeypatch):
+    from usage import UsageLedger
+    monkeypatch.setattr(app_module, 'usage_ledger', UsageLedger(path=None, request_quota=1, overrides={}))
+    monkeypatch.setattr(app_module, 'process_research_task', lambda task: None)
+    client = make_client()
+
+    assert client.post('/api/research', json={'topic': 'MCP'}).status_code == 200
+    for key in ('k0', 'k1', 'k2'):
+        assert client.post('/api/research', json={'topic': 'MCP'}, headers={'X-API-Key': key}).status_code == 401
+    assert client.post('/api/research', json={'topic': 'MCP'}).status_code == 429
+
+
+def test_usage_endpoint_requires_admin_and_hides_keys(monkeypatch, tmp_path):
+    from usage import UsageLedger
+    ledger_path = tmp_path / 'usage.jsonl'
+    ledger = UsageLedger(path=str(ledger_path), token_quota=100000, overrides={'sk-secret-team-a': {}})
+    monkeypatch.setattr(app_module, 'usage_ledger', ledger)
+    monkeypatch.setattr(app_module, 'USAGE_ADMIN_TOKEN', 'admin-token')
+    label = ledger.resolve_client('sk-secret-team-a')
+    ledger.admit(label, 'task-usage')
+    ledger.settle('task-usage', {'prompt_tokens': 1200, 'output_tokens': 300, 'total_tokens': 1550})
+    client = make_client()
+
+    assert client.get('/api/usage').status_code == 401
+    assert client.get('/api/usage', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = client.get('/api/usage?window=3600', headers={'Authorization': 'Bearer admin-token'})
+    payload = response.get_json()
+    usage = payload['clients'][label]
+    assert payload['window_seconds'] == 3600
+    assert usage['requests'] == 1
+    assert usage['total_tokens'] == 1550
+    assert usage['token_quota'] == 100000
+    assert usage['running_tasks'] == 0
+    assert b'sk-secret' not in response.data
+    assert 'sk-secret' not in ledger_path.read_text(encoding='utf-8')
+
+
+def test_usage_endpoint_disabled_without_admin_token(monkeypatch):
+    monkeypatch.setattr(app_module, 'USAGE_ADMIN_TOKEN', None)
+    assert make_client().get('/api/usage').status_code == 403
+
+
+def test_missing_plain_asset_is_not_found(monkeypatch):
+    monkeypatch.delitem(assets, 'script.js')
+    assert make_client().get('/script.js').status_code == 404
+
+
+def test_map_reduce_tasks_reserve_a_larger_estimate(monkeypatch):
+    from usage import ESTIMATED_MAP_REDUCE_TOKENS, ESTIMATED_TASK_TOKENS, UsageLedger
+    ledger = UsageLedger(path=None, token_quota=ESTIMATED_MAP_REDUCE_TOKENS + ESTIMATED_TASK_TOKENS, overrides={})
+    monkeypatch.setattr(app_module, 'usage_ledger', ledger)
+    monkeypatch.setattr(app_module, 'process_research_task', lambda task: None)
+    client = make_client()
+
+    assert client.post('/api/research', json={'topic': 'MCP', 'generation_mode': 'map_reduce'}).status_code == 200
+    assert client.post('/api/research', json={'topic': 'MCP', 'generation_mode': 'map_reduce'}).status_code == 429
+    assert client.post('/api/research', json={'topic': 'MCP'}).status_code == 200
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for map-reduce generation (uses a fake generate function, no API calls)
+Run with: python -m pytest test_generation.py
+"""
+
+import threading
+import time
+
+from cleaning import split_chunks
+from llm import map_reduce_generate
+
+
+class RecordingGenerate:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+
+    def __call__(self, prompt):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.prompts.append(prompt)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if prompt.rstrip().endswith("Notes:"):
+            return "NO RELEVANT CONTENT" if "irrelevant" in prompt else "- a relevant fact"
+        return "final answer"
+
+
+def test_map_reduce_bounds_parallelism_and_merges_digests():
+    generate = RecordingGenerate()
+    sources = [f"source {i}" for i in range(8)] + ["irrelevant page"]
+
+    answer = map_reduce_generate(sources, "MCP", max_workers=3, generate=generate)
+
+    assert answer == "final answer"
+    assert generate.max_in_flight <= 3
+    assert len(generate.prompts) == len(sources) + 1
+    final_prompt = generate.prompts[-1]
+    assert final_prompt.count("NOTES:") == 8
+
+
+def test_split_chunks_respects_limit():
+    content = "\n".join(f"line {i} " + "x" * 50 for i in range(100))
+
+    chunks = split_chunks(content, 500)
+
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == content.replace("\n", "")
+
+
+def test_call_gemini_accumulates_real_usage(monkeypatch):
+    import llm
+    from usage import TokenUsage
+
+    class FakeResponse:
+        text = "answer"
+
+        class usage_metadata:
+            prompt_token_count = 1000
+            candidates_token_count = 200
+            total_token_count = 1250
+
+    class FakeModel:
+        def generate_content(self, prompt):
+            return FakeResponse()
+
+    monkeypatch.setattr(llm, "_model", FakeModel())
+    usage = TokenUsage()
+
+    assert llm.call_gemini("prompt", usage=usage) == "answer"
+    llm.call_gemini("prompt", usage=usage)
+
+    assert usage.as_dict() == {"calls": 2, "prompt_tokens": 2000, "output_tokens": 400, "total_tokens": 2500}
+
+
+def test_cancelled_stream_still_records_usage(monkeypatch):
+    import pytest
+
+    import llm
+    from cancellation import TaskCancelled
+    from usage import TokenUsage
+
+    cancel_event = threading.Event()
+
+    class Chunk:
+        def __init__(self, output_tokens):
+            self.usage_metadata = type("usage_metadata", (), {
+                "prompt_token_count": 1000,
+                "candidates_token_count": output_tokens,
+                "total_token_count": 1000 + output_tokens,
+            })
+
+    def chunks():
+        yield Chunk(50)
+        cancel_event.set()
+        yield Chunk(120)
+        pytest.fail("stream should be abandoned after cancellation")
+
+    class FakeModel:
+        def generate_content(self, prompt, stream=False):
+            return chunks()
+
+    monkeypatch.setattr(llm, "_model", FakeModel())
+    usage = TokenUsage()
+
+    with pytest.raises(TaskCancelled):
+        llm.call_gemini("prompt", cancel_event=cancel_event, usage=usage)
+
+    assert usage.as_dict() == {"calls": 1, "prompt_tokens": 1000, "output_tokens": 120, "total_tokens": 1120}
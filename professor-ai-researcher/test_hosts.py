@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for URL canonicalization, the host scoreboard and link selection
+Run with: python -m pytest test_hosts.py
+"""
+
+from get_links import select_links
+from hosts import HostScoreboard, canonical_url, dedup_key
+
+
+def serper_response(*results):
+    return {"organic": list(results)}
+
+
+def test_canonical_url_strips_tracking_and_fragment():
+    url = "HTTPS://Example.COM:443/post?id=7&utm_source=x&fbclid=abc#comments"
+
+    assert canonical_url(url) == "https://example.com/post?id=7"
+    assert dedup_key("https://www.example.com/post/") == dedup_key("http://example.com/post")
+    # "ref" selects content on many sites, so it is not treated as a tracker
+    assert dedup_key("https://example.com/blob?ref=main") != dedup_key("https://example.com/blob?ref=v1.0")
+
+
+def test_concurrent_saves_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "host_scores.json")
+    app_scoreboard = HostScoreboard(path)
+    batch_scoreboard = HostScoreboard(path)
+
+    app_scoreboard.record("https://a.example/", 0.2, ok=True)
+    batch_scoreboard.record("https://b.example/", 0.4, ok=True)
+    app_scoreboard.save()
+    batch_scoreboard.save()
+
+    assert set(HostScoreboard(path).hosts) == {"a.example", "b.example"}
+
+    # The newer statistics for a host win
+    app_scoreboard.record("https://b.example/", 9.0, ok=False)
+    app_scoreboard.save()
+    batch_scoreboard.save()
+    assert HostScoreboard(path).get("https://b.example/")["latency"] == 9.0
+
+
+def test_scoreboard_persists_and_flags_bad_hosts(tmp_path):
+    path = str(tmp_path / "host_scores.json")
+    scoreboard = HostScoreboard(path)
+    for _ in range(3):
+        scoreboard.record("https://blocked.example/a", 0.5, ok=False)
+        scoreboard.record("https://slow.example/a", 9.0, ok=True, text_chars=4000)
+        scoreboard.record("https://good.example/a", 0.3, ok=True, text_chars=4000)
+    scoreboard.save()
+
+    reloaded = HostScoreboard(path)
+    assert reloaded.is_bad("https://blocked.example/other")
+    assert reloaded.is_slow("https://www.slow.example/b")
+    assert not reloaded.is_bad("https://good.example/b") and not reloaded.is_slow("https://good.example/b")
+    assert not reloaded.is_bad("https://unknown.example/")
+
+
+def test_select_links_dedups_skips_and_reorders():
+    scoreboard = HostScoreboard(path=None)
+    for _ in range(3):
+        scoreboard.record("https://blocked.example/", 0.5, ok=False)
+        scoreboard.record("https://slow.example/", 9.0, ok=True, text_chars=4000)
+
+    data = serper_response(
+        {"link": "https://slow.example/guide"},
+        {"link": "https://docs.example/intro?utm_source=serper",
+         "sitelinks": [{"link": "https://docs.example/spec"}, {"link": "https://docs.example/intro"},
+                       {"link": "https://docs.example/faq"}, {"link": "https://docs.example/extra"}]},
+        {"link": "https://www.docs.example/intro/"},
+        {"link": "https://blocked.example/page"},
+        {"link": "https://blog.example/post"},
+    )
+
+    links = select_links(data, scoreboard, max_links=10)
+
+    assert links == [
+        "https://docs.example/intro",
+        "https://blog.example/post",
+        "https://docs.example/spec",
+        "https://slow.example/guide",
+    ]
+
+
+def test_select_links_respects_max_links():
+    data = serper_response(*({"link": f"https://site{i}.example/"} for i in range(20)))
+
+    assert len(select_links(data, HostScoreboard(path=None), max_links=5)) == 5
+
+
+def test_bad_host_is_probed_again_after_ttl(monkeypatch):
+    import hosts
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(hosts.time, "time", lambda: now[0])
+    scoreboard = HostScoreboard(path=None, ttl=3600)
+    for _ in range(3):
+        scoreboard.record("https://flaky.example/a", 0.5, ok=False)  # e.g. a burst of 429s
+    assert scoreboard.is_bad("https://flaky.example/a")
+
+    now[0] += 3601
+    assert not scoreboard.is_bad("https://flaky.example/a")
+    assert select_links(serper_response({"link": "https://flaky.example/a"}), scoreboard) == ["https://flaky.example/a"]
+
+    # The probe starts a fresh record instead of averaging with the outage
+    scoreboard.record("https://flaky.example/a", 0.4, ok=True, text_chars=3000)
+    stats = scoreboard.get("https://flaky.example/a")
+    assert stats["fetches"] == 1 and stats["failure_rate"] == 0.0
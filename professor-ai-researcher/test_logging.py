@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued structured logging layer
+Run with: python -m pytest test_logging.py
+"""
+
+import io
+import json
+import threading
+
+import pytest
+
+from llm import map_reduce_generate
+from logger import configure_logging, current_task_id, get_logger, shutdown_logging
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    configure_logging("INFO", "json", stream=stream)
+    yield stream
+    shutdown_logging()
+
+
+def records(stream):
+    shutdown_logging()  # drain the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_carry_task_id_and_fields(log_stream):
+    log = get_logger("test")
+    token = current_task_id.set("task-1")
+    try:
+        log.info("Scraped page", extra={"url": "https://example.com/", "latency_ms": 12})
+        log.debug("Per-URL detail stays off by default")
+    finally:
+        current_task_id.reset(token)
+    log.warning("No task here")
+
+    first, second = records(log_stream)
+    assert first["msg"] == "Scraped page" and first["level"] == "INFO" and first["logger"] == "professor.test"
+    assert first["task_id"] == "task-1"
+    assert first["url"] == "https://example.com/" and first["latency_ms"] == 12
+    assert second["msg"] == "No task here" and "task_id" not in second
+
+
+def test_full_queue_drops_records_and_reports_the_count():
+    import logging
+    import queue
+
+    from logger import _QueueHandler
+
+    log_queue = queue.Queue(maxsize=2)
+    handler = _QueueHandler(log_queue)
+    log = logging.getLogger("professor.test.full_queue")
+    log.propagate = False
+    log.addHandler(handler)
+
+    for i in range(5):
+        log.warning("record %d", i)
+    assert log_queue.qsize() == 2 and handler.dropped == 3
+
+    log_queue.get_nowait()
+    log.warning("after the stall")
+    last = list(log_queue.queue)[-1]
+    assert last.getMessage() == "after the stall" and last.dropped_records == 3
+    assert handler.dropped == 0
+
+
+def test_map_reduce_digests_log_with_callers_task_id(log_stream):
+    calls = []
+
+    def generate(prompt):
+        calls.append(threading.get_ident())
+        if prompt.rstrip().endswith("Notes:") and len(calls) == 1:
+            raise RuntimeError("quota")
+        return "- a note"
+
+    token = current_task_id.set("task-2")
+    try:
+        map_reduce_generate(["source one", "source two", "source three"], "MCP",
+                            max_workers=2, generate=generate)
+    finally:
+        current_task_id.reset(token)
+
+    failures = [r for r in records(log_stream) if r["msg"].startswith("Digest failed")]
+    assert len(failures) == 1
+    assert failures[0]["task_id"] == "task-2" and failures[0]["error"] == "quota"
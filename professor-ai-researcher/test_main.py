@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the resumable batch CLI in main.py (pipeline stages are faked)
+Run with: python -m pytest test_main.py
+"""
+
+import io
+import json
+
+import main
+
+
+def fake_pipeline(monkeypatch, calls, fail_generation=False):
+    def get_links(topic):
+        calls.append(("search", topic))
+        return [f"https://example.com/{topic}"]
+
+    def scrape_links(links, save_logs=True, log_folder=None):
+        calls.append(("scrape", links[0]))
+
+    def call_gemini(prompt):
+        if fail_generation:
+            raise RuntimeError("quota exceeded")
+        return "answer"
+
+    monkeypatch.setattr(main, "get_links", get_links)
+    monkeypatch.setattr(main, "scrape_links", scrape_links)
+    monkeypatch.setattr(main, "initialize_logs", lambda topic: f"logs/{topic}")
+    monkeypatch.setattr(main, "combine_logs", lambda folder: "context")
+    monkeypatch.setattr(main, "call_gemini", call_gemini)
+
+
+def test_read_topics_skips_blanks_and_comments(tmp_path):
+    topics_file = tmp_path / "topics.txt"
+    topics_file.write_text("MCP\n\n# nightly\nRAG\n", encoding="utf-8")
+
+    assert main.read_topics(str(topics_file)) == ["MCP", "RAG"]
+
+
+def test_batch_streams_jsonl(monkeypatch, tmp_path):
+    calls = []
+    fake_pipeline(monkeypatch, calls)
+    output = io.StringIO()
+
+    failures = main.run_batch(["MCP", "RAG", "MCP"], output, str(tmp_path), parallel=2)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failures == 0
+    assert sorted(r["topic"] for r in records) == ["MCP", "RAG"]
+    assert all(r["status"] == "completed" and r["answer"] == "answer" for r in records)
+
+
+def test_interrupted_batch_resumes_after_last_stage(monkeypatch, tmp_path):
+    calls = []
+    fake_pipeline(monkeypatch, calls, fail_generation=True)
+    assert main.run_batch(["MCP"], io.StringIO(), str(tmp_path)) == 1
+
+    calls.clear()
+    fake_pipeline(monkeypatch, calls)
+    output = io.StringIO()
+    assert main.run_batch(["MCP"], output, str(tmp_path)) == 0
+
+    # Search and scrape were checkpointed, only generation ran again
+    assert calls == []
+    assert json.loads(output.getvalue())["answer"] == "answer"
+
+    record = json.loads(output.getvalue())
+
+    # Completed topics are not researched again, but their records are written out again
+    calls.clear()
+    output = io.StringIO()
+    main.run_batch(["MCP"], output, str(tmp_path))
+    assert calls == []
+    assert json.loads(output.getvalue()) == record
+
+
+def test_resumed_batch_output_holds_every_topic(monkeypatch, tmp_path):
+    calls = []
+    fake_pipeline(monkeypatch, calls)
+    main.run_batch(["MCP"], io.StringIO(), str(tmp_path))
+
+    calls.clear()
+    output = io.StringIO()
+    assert main.run_batch(["MCP", "RAG"], output, str(tmp_path)) == 0
+
+    assert calls == [("search", "RAG"), ("scrape", "https://example.com/RAG")]
+    assert [json.loads(line)["topic"] for line in output.getvalue().splitlines()] == ["MCP", "RAG"]
+
+
+def test_run_id_depends_only_on_the_topics():
+    topics = ["MCP", "RAG"]
+
+    # Stable across days, so resuming after midnight still finds the checkpoints
+    assert main.default_run_id(topics) == main.default_run_id(list(topics))
+    assert main.default_run_id(topics) != main.default_run_id(["MCP"])
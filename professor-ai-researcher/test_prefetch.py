@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Tests for speculative prefetch of search results and pages (no network)
+Run with: python -m pytest test_prefetch.py
+"""
+
+import threading
+
+import pytest
+
+import app as app_module
+import hosts
+from app import ResearchTask, process_research_task
+from cancellation import check_cancelled
+from prefetch import Prefetcher
+
+
+@pytest.fixture(autouse=True)
+def in_memory_scoreboard(monkeypatch):
+    """Keep host statistics from these fake fetches out of logs/host_scores.json, and tasks out of the app"""
+    monkeypatch.setattr(hosts, "_scoreboard", hosts.HostScoreboard(path=None))
+    monkeypatch.setattr(app_module, "active_tasks", {})
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+
+def page(title):
+    return f"<html><head><title>{title}</title></head><body><article>{title} text.</article></body></html>".encode()
+
+
+def fake_search(topic):
+    slug = topic.lower().replace(" ", "-")
+    return [f"https://example.com/{slug}/{i}" for i in range(5)]
+
+
+def fake_fetch(link, cancel_event=None, max_bytes=None):
+    check_cancelled(cancel_event)
+    body = page(link.rsplit("/", 2)[-2])
+    if max_bytes is not None and len(body) > max_bytes:
+        raise ValueError("too large")
+    return FakeResponse(), body
+
+
+def test_prefetch_warms_top_pages_and_claim_takes_them():
+    prefetcher = Prefetcher(pages=3, search=fake_search, fetch=fake_fetch)
+
+    assert prefetcher.request("Model Context  Protocol", "client-a") in ("warming", "ready")
+    prefetcher.entries["model context protocol"].done.wait(1)
+    entry = prefetcher.claim("model context protocol", "client-a")
+
+    assert entry.links == fake_search("Model Context  Protocol")
+    assert list(entry.pages) == entry.links[:3]
+    response, body, latency = entry.pages[entry.links[0]]
+    assert response.status_code == 200 and body.startswith(b"<html>") and latency >= 0
+    # Claimed data leaves the cache and its bytes leave the budget
+    assert prefetcher.entries == {} and prefetcher.bytes == 0
+    assert prefetcher.claim("model context protocol", "client-a") is None
+
+
+def warmed(prefetcher, topic, client="client-a"):
+    prefetcher.request(topic, client)
+    prefetcher.entries[topic.lower()].done.wait(1)
+    return prefetcher.claim(topic, client)
+
+
+def test_byte_budget_limits_warmed_pages():
+    one_page = len(page("rag"))
+    prefetcher = Prefetcher(pages=5, max_bytes=2 * one_page, search=fake_search, fetch=fake_fetch)
+
+    assert len(warmed(prefetcher, "RAG").pages) == 2
+
+    small = Prefetcher(pages=5, page_bytes=one_page - 1, search=fake_search, fetch=fake_fetch)
+    assert warmed(small, "RAG").pages == {}
+
+
+def test_claim_does_not_wait_for_slow_pages():
+    cancelled = threading.Event()
+
+    def slow_fetch(link, cancel_event=None, max_bytes=None):
+        if link.endswith("/1"):
+            cancel_event.wait(5)
+            cancelled.set()
+        return fake_fetch(link, cancel_event, max_bytes)
+
+    prefetcher = Prefetcher(pages=3, search=fake_search, fetch=slow_fetch)
+    prefetcher.request("vector search", "client-a")
+    entry = prefetcher.entries["vector search"]
+    while not entry.pages:
+        entry.done.wait(0.01)
+
+    claimed = prefetcher.claim("vector search", "client-a", wait=5)
+
+    # The links and the finished first page are handed over, the stuck download is cancelled
+    assert claimed is entry and claimed.links == fake_search("vector search")
+    assert list(claimed.pages) == claimed.links[:1]
+    assert cancelled.wait(1) and entry.done.wait(1)
+    assert list(claimed.pages) == claimed.links[:1] and prefetcher.bytes == 0
+
+
+def test_only_the_requesting_client_can_claim():
+    prefetcher = Prefetcher(search=fake_search, fetch=fake_fetch)
+    prefetcher.request("vector search", "client-a")
+
+    assert prefetcher.claim("vector search", "client-b") is None
+    assert "vector search" in prefetcher.entries
+    assert prefetcher.claim("vector search", "client-a").links == fake_search("vector search")
+
+
+def test_abandoned_and_expired_prefetches_are_evicted():
+    prefetcher = Prefetcher(concurrency=10, search=fake_search, fetch=fake_fetch)
+
+    prefetcher.request("mach", "client-a")
+    abandoned = prefetcher.entries["mach"]
+    prefetcher.request("mach", "client-b")
+    prefetcher.request("machine learning", "client-a")
+
+    # client-b still wants "mach"
+    assert set(prefetcher.entries) == {"mach", "machine learning"}
+    prefetcher.request("machine vision", "client-b")
+    assert set(prefetcher.entries) == {"machine learning", "machine vision"}
+    assert abandoned.cancel_event.is_set()
+
+    for entry in prefetcher.entries.values():
+        entry.done.wait(1)
+        entry.last_used -= prefetcher.ttl + 1
+    prefetcher.evict_expired()
+    assert prefetcher.entries == {} and prefetcher.bytes == 0
+
+
+def test_concurrency_limit_and_disabled():
+    release = threading.Event()
+
+    def slow_search(topic):
+        release.wait(1)
+        return fake_search(topic)
+
+    prefetcher = Prefetcher(concurrency=1, search=slow_search, fetch=fake_fetch)
+    assert prefetcher.request("first topic", "client-a") == "warming"
+    assert prefetcher.request("second topic", "client-b") == "busy"
+    release.set()
+
+    assert Prefetcher(concurrency=0).request("anything", "client-a") == "disabled"
+    assert prefetcher.request("ab", "client-c") == "skipped"
+
+
+def test_submitted_task_starts_from_prefetched_data(monkeypatch, tmp_path):
+    prefetcher = Prefetcher(pages=2, search=fake_search, fetch=fake_fetch)
+    monkeypatch.setattr(app_module, "prefetcher", prefetcher)
+    monkeypatch.setattr(app_module, "get_links", lambda topic: pytest.fail("search should come from prefetch"))
+    monkeypatch.setattr(app_module, "initialize_logs", lambda topic: str(tmp_path))
+    monkeypatch.setattr(app_module, "call_gemini", lambda prompt, **kwargs: "answer")
+
+    fetched = []
+
+    def network_fetch(link, **kwargs):
+        fetched.append(link)
+        return fake_fetch(link)
+
+    monkeypatch.setattr("scrape.fetch_page", network_fetch)
+
+    prefetcher.request("MCP servers", "client-a")
+    prefetcher.entries["mcp servers"].done.wait(1)
+    task = ResearchTask("task-prefetch", "mcp servers", prefetch_key="client-a")
+    process_research_task(task)
+
+    assert task.status == "completed"
+    assert task.metadata["prefetched_pages"] == 2
+    assert task.metadata["sources_count"] == 5
+    # Only the pages beyond the prefetched top two were downloaded by the task
+    assert fetched == fake_search("MCP servers")[2:]
+
+
+def test_prefetch_endpoint_counts_searches_against_quota(monkeypatch):
+    from usage import UsageLedger
+    ledger = UsageLedger(path=None, overrides={}, prefetch_quota=2)
+    monkeypatch.setattr(app_module, "usage_ledger", ledger)
+    prefetcher = Prefetcher(concurrency=10, search=fake_search, fetch=fake_fetch)
+    monkeypatch.setattr(app_module, "prefetcher", prefetcher)
+    client = app_module.app.test_client()
+
+    def prefetch(topic, session="tab-1"):
+        return client.post("/api/prefetch", json={"topic": topic, "session": session})
+
+    assert prefetch("machine").status_code == 202
+    assert prefetch("machine").status_code == 202  # already warming: no new search
+    assert prefetch("machine learning").status_code == 202
+    rejected = prefetch("machine vision")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) > 0
+    assert ledger.summary()["anonymous"]["prefetches"] == 2
+    # A refused prefetch leaves the session's previous one in place
+    assert set(prefetcher.entries) == {"machine learning"} and prefetcher.warming <= 1
+
+    unknown = client.post("/api/prefetch", json={"topic": "RAG"}, headers={"X-API-Key": "made-up"})
+    assert unknown.status_code == 401
+
+
+def test_sessions_behind_one_address_keep_their_prefetches(monkeypatch):
+    from usage import UsageLedger
+    prefetcher = Prefetcher(search=fake_search, fetch=fake_fetch)
+    monkeypatch.setattr(app_module, "usage_ledger", UsageLedger(path=None, overrides={}))
+    monkeypatch.setattr(app_module, "prefetcher", prefetcher)
+    client = app_module.app.test_client()
+
+    client.post("/api/prefetch", json={"topic": "vector databases", "session": "tab-1"})
+    client.post("/api/prefetch", json={"topic": "graph databases", "session": "tab-2"})
+
+    assert set(prefetcher.entries) == {"vector databases", "graph databases"}
+
+
+def test_task_claims_only_its_own_sessions_prefetch(monkeypatch, tmp_path):
+    from usage import UsageLedger
+    prefetcher = Prefetcher(search=fake_search, fetch=fake_fetch)
+    monkeypatch.setattr(app_module, "usage_ledger", UsageLedger(path=None, overrides={}))
+    monkeypatch.setattr(app_module, "prefetcher", prefetcher)
+    claimed = []
+    monkeypatch.setattr(app_module, "process_research_task",
+                        lambda task: claimed.append(prefetcher.claim(task.topic, task.prefetch_key)))
+    client = app_module.app.test_client()
+
+    client.post("/api/prefetch", json={"topic": "vector databases", "session": "tab-1"})
+    client.post("/api/research", json={"topic": "vector databases", "session": "tab-2"})
+    assert claimed == [None] and "vector databases" in prefetcher.entries
+
+    client.post("/api/research", json={"topic": "Vector  databases", "session": "tab-1"})
+    assert claimed[1].links == fake_search("vector databases")
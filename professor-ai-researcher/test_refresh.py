@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental topic refresh (no network: requests.get is faked)
+Run with: python -m pytest test_refresh.py
+"""
+
+import os
+
+import pytest
+
+import hosts
+import refresh
+import scrape
+from cleaning import combine_logs
+
+
+@pytest.fixture(autouse=True)
+def in_memory_scoreboard(monkeypatch):
+    """Keep host statistics from these fake fetches out of logs/host_scores.json"""
+    monkeypatch.setattr(hosts, "_scoreboard", hosts.HostScoreboard(path=None))
+
+
+class FakeResponse:
+    def __init__(self, status_code, html=b"", etag=None):
+        self.status_code = status_code
+        self.content = html
+        self.headers = {"ETag": etag} if etag else {}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def page(title, text):
+    return f"<html><head><title>{title}</title></head><body><article>{text}</article></body></html>".encode()
+
+
+def fake_get(pages):
+    """pages: url -> (html, etag); answers 304 when If-None-Match matches."""
+    def get(url, timeout=10, headers=None, stream=False):
+        html, etag = pages[url]
+        if headers and etag and headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, html, etag)
+    return get
+
+
+def make_run(tmp_path, name):
+    folder = tmp_path / "logs" / name
+    folder.mkdir(parents=True)
+    return str(folder)
+
+
+def test_find_previous_run_picks_latest(tmp_path):
+    logs = tmp_path / "logs"
+    for name in ["MCP_20250101_090000", "MCP_20250102_090000", "MCP server_20250103_090000"]:
+        (logs / name).mkdir(parents=True)
+
+    assert refresh.find_previous_run("MCP", str(logs)) == str(logs / "MCP_20250102_090000")
+    assert refresh.find_previous_run("Other", str(logs)) is None
+
+
+def test_refresh_reuses_unchanged_and_fetches_new(tmp_path, monkeypatch):
+    pages = {
+        "https://a.example": (page("A", "alpha"), '"a1"'),
+        "https://b.example": (page("B", "beta"), None),
+        "https://c.example": (page("C", "gamma"), '"c1"'),
+    }
+    monkeypatch.setattr(scrape.requests, "get", fake_get(pages))
+
+    first = make_run(tmp_path, "MCP_20250101_090000")
+    scrape.scrape_links(["https://a.example", "https://b.example"], save_logs=True, log_folder=first)
+
+    second = make_run(tmp_path, "MCP_20250101_100000")
+    stats = refresh.refresh_links(["https://a.example", "https://b.example", "https://c.example"], second, first)
+
+    assert stats == {"new": 1, "changed": 0, "unchanged": 2, "failed": 0, "dropped": 0}
+    # Reused pages are byte-identical, so the combined context for them is unchanged
+    assert open(os.path.join(second, "001_A.md")).read() == open(os.path.join(first, "001_A.md")).read()
+    assert "gamma" in combine_logs(second)
+
+
+def test_refresh_detects_changed_content(tmp_path, monkeypatch):
+    pages = {"https://b.example": (page("B", "beta"), None)}
+    monkeypatch.setattr(scrape.requests, "get", fake_get(pages))
+
+    first = make_run(tmp_path, "MCP_20250101_090000")
+    scrape.scrape_links(["https://b.example"], save_logs=True, log_folder=first)
+
+    pages["https://b.example"] = (page("B", "beta, revised"), None)
+    second = make_run(tmp_path, "MCP_20250101_100000")
+    stats = refresh.refresh_links(["https://b.example"], second, first)
+
+    assert stats["changed"] == 1
+    assert "revised" in combine_logs(second)
+
+
+def test_cached_answer_requires_same_context(tmp_path):
+    folder = make_run(tmp_path, "MCP_20250101_090000")
+    key = refresh.answer_key("context", "MCP")
+    refresh.save_answer(folder, key, "answer")
+
+    assert refresh.load_cached_answer(folder, key) == "answer"
+    assert refresh.load_cached_answer(folder, refresh.answer_key("new context", "MCP")) is None
+    assert refresh.load_cached_answer(None, key) is None
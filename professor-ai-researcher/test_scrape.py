@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for page extraction and boilerplate removal in scrape.py
+Run with: python -m pytest test_scrape.py
+"""
+
+from scrape import extract_page
+
+PAGE = """<html><head><title>MCP</title></head><body>
+<nav><ul><li><a href="/docs">Docs</a></li><li><a href="/blog">Blog</a></li></ul></nav>
+<main>
+<h1>Model Context Protocol</h1>
+<p>The Model Context Protocol is an open standard that connects AI assistants to the systems
+where data lives, see <a href="/spec">the spec</a>.</p>
+<p>HTTP cookies are small pieces of data stored by browsers and sent back with each request.</p>
+<div class="related"><a href="/1">Related post one</a> <a href="/2">Related post two</a></div>
+<div>We use cookies to improve your experience on this site and to measure how it is used. <a href="/privacy">Learn more</a></div>
+<p><a href="/">Home</a> | <a href="/about">About</a></p>
+<footer>Copyright © 2025 Example. All rights reserved.</footer>
+</main>
+</body></html>""".encode("utf-8")
+
+
+def test_boilerplate_is_removed_and_content_kept():
+    title, text, removed_chars = extract_page(PAGE, "fallback")
+
+    assert title == "MCP"
+    assert "open standard that connects AI assistants" in text
+    assert "the spec" in text
+    assert "HTTP cookies are small pieces of data" in text
+    for boilerplate in ["Docs", "Related post", "We use cookies", "About", "All rights reserved"]:
+        assert boilerplate not in text
+    assert removed_chars > 0
+
+
+def test_plain_article_is_untouched():
+    html = b"<html><body><article><p>Only useful text here, nothing else.</p></article></body></html>"
+
+    title, text, removed_chars = extract_page(html, "Article_1")
+
+    assert title == "Article_1"
+    assert text == "Only useful text here, nothing else."
+    assert removed_chars == 0
+
+
+def test_prose_with_boilerplate_phrases_is_kept():
+    paragraphs = [
+        "Every MCP client and server share this session state for the lifetime of a connection.",
+        "Developers must sign up for an API key before the server accepts requests.",
+        "The protocol says nothing about the privacy policy of the tools a server exposes.",
+        "Transports carry JSON-RPC messages over stdio or streamable HTTP.",
+    ]
+    html = ("<html><body><article>" + "".join(f"<p>{p}</p>" for p in paragraphs)
+            + "</article></body></html>").encode("utf-8")
+
+    title, text, removed_chars = extract_page(html, "Article_1")
+
+    assert text.split("\n") == paragraphs
+    assert removed_chars == 0
+
+
+def test_short_paragraph_with_one_link_is_kept():
+    paragraphs = [
+        'See <a href="/spec">the MCP specification</a>.',
+        'Servers expose tools, as <a href="/tools">the tools guide</a> explains.',
+    ]
+    html = ("<html><body><article>" + "".join(f"<p>{p}</p>" for p in paragraphs)
+            + '<p><a href="/">Home</a> | <a href="/blog">Blog</a></p></article></body></html>').encode("utf-8")
+
+    title, text, removed_chars = extract_page(html, "Article_1")
+
+    for kept in ["See", "the MCP specification", "Servers expose tools, as", "the tools guide", "explains."]:
+        assert kept in text
+    assert "Home" not in text and "Blog" not in text
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Cold-start checks: heavy modules stay lazy and `import app` fits the budget
+Run with: python -m pytest test_startup.py
+Override the budget with COLD_START_BUDGET_MS on slow machines.
+"""
+
+import subprocess
+import sys
+
+from start import COLD_START_BUDGET_US, import_time_report
+
+HEAVY_MODULES = ['google.generativeai', 'bs4']
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    check = "import sys, app; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_cold_start_within_budget():
+    total_us, rows = import_time_report('app')
+
+    slowest = ', '.join(f"{name.strip()} {cum / 1000:.0f}ms" for cum, _, name in rows[:5])
+    assert total_us <= COLD_START_BUDGET_US, f"import app took {total_us / 1000:.0f}ms ({slowest})"
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from logger import get_logger
+
+log = get_logger("usage")
+
+# Append-only record of admitted requests and settled token usage, for billing
+USAGE_LEDGER_PATH = os.environ.get("USAGE_LEDGER_PATH", os.path.join("logs", "usage.jsonl"))
+
+# Default quotas per client and window; 0 means unlimited
+CLIENT_TOKEN_QUOTA = int(os.environ.get("CLIENT_TOKEN_QUOTA", "0"))
+CLIENT_REQUEST_QUOTA = int(os.environ.get("CLIENT_REQUEST_QUOTA", "0"))
+QUOTA_WINDOW_SECONDS = int(os.environ.get("QUOTA_WINDOW_SECONDS", "86400"))
+
+# JSON file listing the accepted API keys, with optional quotas and a non-secret label:
+# {"client-key": {"label": "team-a", "tokens": 50000, "requests": 20}}
+CLIENT_QUOTAS_FILE = os.environ.get("CLIENT_QUOTAS_FILE")
+
+# Requests without an X-API-Key share this client's quotas
+ANONYMOUS_CLIENT = "anonymous"
+
+# Speculative searches (POST /api/prefetch) per client and window; 0 means unlimited
+CLIENT_PREFETCH_QUOTA = int(os.environ.get("CLIENT_PREFETCH_QUOTA", "200"))
+
+# Tokens held back for each running task until its real usage is known, by generation mode:
+# a map-reduce task makes one digest call per source plus the synthesis call
+ESTIMATED_TASK_TOKENS = int(os.environ.get("ESTIMATED_TASK_TOKENS", "3000"))
+ESTIMATED_MAP_REDUCE_TOKENS = int(os.environ.get("ESTIMATED_MAP_REDUCE_TOKENS", "40000"))
+
+# Events older than this are dropped from memory (the ledger file keeps them)
+USAGE_RETENTION_SECONDS = 30 * 86400
+
+
+class UnknownClient(Exception):
+    """Raised for an API key that is not listed in CLIENT_QUOTAS_FILE."""
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenUsage:
+    """Thread-safe accumulator of real token counts across one task's LLM calls."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+
+    def add(self, prompt_tokens: int, output_tokens: int, total_tokens: int):
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.total_tokens += total_tokens
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": self.total_tokens,
+            }
+
+
+def load_quota_overrides(path: Optional[str] = CLIENT_QUOTAS_FILE) -> Dict[str, dict]:
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        log.error("Could not read client quotas", extra={"path": path, "error": str(e)})
+        return {}
+
+
+def client_label(api_key: str, settings: dict) -> str:
+    """Name under which a key's usage is recorded and reported; never the key itself."""
+    return settings.get("label") or "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class UsageLedger:
+    """Per-client request and token accounting with quota checks at admission.
+
+    Clients are identified by label (see client_label), so the ledger file and
+    usage reports never contain API keys.
+    """
+
+    def __init__(self, path: Optional[str] = USAGE_LEDGER_PATH, window: int = QUOTA_WINDOW_SECONDS,
+                 token_quota: int = CLIENT_TOKEN_QUOTA, request_quota: int = CLIENT_REQUEST_QUOTA,
+                 overrides: Optional[Dict[str, dict]] = None, prefetch_quota: int = CLIENT_PREFETCH_QUOTA):
+        self.path = path
+        self.window = window
+        self.token_quota = token_quota
+        self.request_quota = request_quota
+        self.prefetch_quota = prefetch_quota
+        overrides = load_quota_overrides() if overrides is None else overrides
+        self.clients = {key: client_label(key, settings) for key, settings in overrides.items()}
+        self.client_quotas = {self.clients[key]: settings for key, settings in overrides.items()}
+        self.lock = threading.Lock()
+        self.events = []
+        self.reserved = {}  # task_id -> (client, estimated tokens)
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        cutoff = time.time() - USAGE_RETENTION_SECONDS
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("time", 0) >= cutoff:
+                    self.events.append(event)
+
+    def _append(self, event: dict):
+        self.events.append(event)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+
+    def resolve_client(self, api_key: Optional[str]) -> str:
+        """Client label for an X-API-Key value; raises UnknownClient for keys not in the quotas file."""
+        if not api_key:
+            return ANONYMOUS_CLIENT
+        client = self.clients.get(api_key)
+        if client is None:
+            raise UnknownClient("Unknown API key")
+        return client
+
+    def quotas(self, client: str):
+        """(token quota, request quota) for a client; 0 means unlimited."""
+        override = self.client_quotas.get(client, {})
+        return override.get("tokens", self.token_quota), override.get("requests", self.request_quota)
+
+    def _window_totals(self, client: str, since: float):
+        requests = tokens = 0
+        for event in self.events:
+            if event["client"] == client and event["time"] >= since:
+                requests += event.get("requests", 0)
+                tokens += event.get("total_tokens", 0)
+        return requests, tokens
+
+    def admit(self, client: str, task_id: str, generation_mode: str = "single"):
+        """Count a new task against the client's quotas, or raise QuotaExceeded.
+
+        Running tasks hold an estimate for their generation mode until settle()
+        records their real usage, so a burst of requests is admitted against
+        tokens it is likely to use. The estimate is not a cap: a task that uses
+        more than it can still take the client past the quota.
+        """
+        estimate = ESTIMATED_MAP_REDUCE_TOKENS if generation_mode == "map_reduce" else ESTIMATED_TASK_TOKENS
+        now = time.time()
+        with self.lock:
+            self.events = [e for e in self.events if e["time"] >= now - USAGE_RETENTION_SECONDS]
+            since = now - self.window
+            requests, tokens = self._window_totals(client, since)
+            reserved = sum(t for c, t in self.reserved.values() if c == client)
+            token_quota, request_quota = self.quotas(client)
+
+            window_events = [e for e in self.events if e["client"] == client and e["time"] >= since]
+            retry_after = int(min((e["time"] for e in window_events), default=now) + self.window - now) + 1
+
+            if request_quota and requests >= request_quota:
+                raise QuotaExceeded(f"Request quota of {request_quota} per {self.window}s exceeded", retry_after)
+            if token_quota and tokens + reserved + estimate > token_quota:
+                raise QuotaExceeded(f"Token quota of {token_quota} per {self.window}s exceeded", retry_after)
+
+            self.reserved[task_id] = (client, estimate)
+            self._append({"time": now, "client": client, "task_id": task_id, "requests": 1})
+
+    def admit_prefetch(self, client: str):
+        """Count one speculative search against the client's prefetch quota, or raise QuotaExceeded."""
+        now = time.time()
+        with self.lock:
+            since = now - self.window
+            prefetches = [e for e in self.events
+                          if e["client"] == client and e["time"] >= since and e.get("prefetches")]
+            quota = self.client_quotas.get(client, {}).get("prefetches", self.prefetch_quota)
+            if quota and len(prefetches) >= quota:
+                retry_after = int(min(e["time"] for e in prefetches) + self.window - now) + 1
+                raise QuotaExceeded(f"Prefetch quota of {quota} per {self.window}s exceeded", retry_after)
+            self._append({"time": now, "client": client, "prefetches": 1})
+
+    def settle(self, task_id: str, usage: dict):
+        """Replace a task's reservation with the tokens it actually used."""
+        with self.lock:
+            reservation = self.reserved.pop(task_id, None)
+            if reservation is None:
+                return
+            client, _ = reservation
+            self._append({
+                "time": time.time(), "client": client, "task_id": task_id, "requests": 0,
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            })
+
+    def summary(self, client: Optional[str] = None, window: Optional[int] = None) -> Dict[str, dict]:
+        """Usage per client over the last `window` seconds (default: the quota window)."""
+        window = window or self.window
+        since = time.time() - window
+        clients = {}
+        with self.lock:
+            for event in self.events:
+                if event["time"] < since or (client and event["client"] != client):
+                    continue
+                totals = clients.setdefault(event["client"], {
+                    "requests": 0, "prefetches": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0
+                })
+                totals["requests"] += event.get("requests", 0)
+                totals["prefetches"] += event.get("prefetches", 0)
+                for key in ("prompt_tokens", "output_tokens", "total_tokens"):
+                    totals[key] += event.get(key, 0)
+
+            for name, totals in clients.items():
+                token_quota, request_quota = self.quotas(name)
+                totals["running_tasks"] = sum(1 for c, _ in self.reserved.values() if c == name)
+                totals["token_quota"] = token_quota or None
+                totals["request_quota"] = request_quota or None
+        return clients